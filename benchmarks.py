@@ -0,0 +1,782 @@
+# Course: CS261 - Data Structures
+# Assignment: 6
+# Description: Micro-benchmarks for the hash map implementations.
+#              Run all of them with `python benchmarks.py`, or pick some by name:
+#              `python benchmarks.py resize_key_length`
+
+import gc
+import itertools
+import os
+import random
+import sys
+import threading
+import time
+import tracemalloc
+
+import hash_map_concurrent
+import hash_map_oa
+import hash_map_oa_compact
+import hash_map_rh
+import hash_map_sc
+import hash_map_sharded
+import hash_map_shm
+from a6_include import HASH_FUNCTIONS, LinkedList, hash_function_1, hash_function_2, hash_many
+
+
+def _best_time(setup, run, repeat: int = 5) -> float:
+    """
+    Returns the best wall time in seconds of run(setup()) over repeat rounds. setup is not timed.
+    """
+    best = None
+    for _ in range(repeat):
+        state = setup()
+        start = time.perf_counter()
+        run(state)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def _spread_keys(count: int, length: int = 24) -> list:
+    """
+    Returns count random keys drawn from a wide range of code points. The sample hash functions sum character codes,
+    so short ASCII keys all land in a narrow range of hashes and benchmarks would only measure the clustering.
+    """
+    rand = random.Random(count)
+    return [''.join(chr(rand.randrange(33, 0x2000)) for _ in range(length)) for _ in range(count)]
+
+
+def _filled(module, keys, function=hash_function_2):
+    """
+    Returns a new HashMap from the given module holding every key in keys
+    """
+    m = module.HashMap(11, function)
+    for key in keys:
+        m.put(key, None)
+    return m
+
+
+def _bytes_per_entry(build, count: int) -> float:
+    """
+    Returns the memory traced while build() runs, divided by count. The keys and values are allocated beforehand
+    by the caller, so only the table itself is measured.
+    """
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    table = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del table
+    return (after - before) / count
+
+
+# ------------------- BENCHMARKS ------------------------------------------- #
+
+def bench_resize_key_length() -> None:
+    """
+    Times a single doubling of a 5000 key map for growing key lengths. Since entries cache their full hash the
+    resize cost should stay flat, while re-hashing every key (the old behaviour) grows with the key length.
+    """
+    print("\nresize_table() time vs key length (5000 keys)")
+    print("---------------------------------------------")
+    print(f"{'key length':>10} {'SC resize ms':>13} {'OA resize ms':>13} {'re-hash ms':>11}")
+    for length in (8, 64, 512):
+        keys = [str(i).rjust(length, 'k') for i in range(5000)]
+        row = [length]
+        for module in (hash_map_sc, hash_map_oa):
+            row.append(_best_time(lambda: _filled(module, keys),
+                                  lambda m: m.resize_table(m.get_capacity() * 2)) * 1000)
+        row.append(_best_time(lambda: keys, lambda ks: [hash_function_2(k) for k in ks]) * 1000)
+        print(f"{row[0]:>10} {row[1]:>13.2f} {row[2]:>13.2f} {row[3]:>11.2f}")
+
+
+def bench_rehash_engine() -> None:
+    """
+    Compares resize_table(), which moves entries in one pass with a single probe walk each, against rebuilding the
+    same table by put()-ing every pair into a map of the target capacity (load check, duplicate probe and insert
+    probe per entry).
+    """
+    print("\nresize_table() vs rebuilding through put()")
+    print("------------------------------------------")
+    print(f"{'map':>4} {'keys':>7} {'resize ms':>10} {'put() ms':>10} {'speedup':>8}")
+    for module in (hash_map_sc, hash_map_oa):
+        for count in (1000, 5000, 10000):
+            keys = ['key' + str(i) for i in range(count)]
+
+            def rebuild(m):
+                target = module.HashMap(m.get_capacity() * 2, hash_function_2)
+                pairs = m.get_keys_and_values()
+                for i in range(pairs.length()):
+                    target.put(pairs[i][0], pairs[i][1])
+
+            resize = _best_time(lambda: _filled(module, keys), lambda m: m.resize_table(m.get_capacity() * 2), 3)
+            put = _best_time(lambda: _filled(module, keys), rebuild, 3)
+            print(f"{module.__name__[-2:].upper():>4} {count:>7} {resize * 1000:>10.2f} {put * 1000:>10.2f} "
+                  f"{put / resize:>7.1f}x")
+
+
+def bench_tombstone_churn() -> None:
+    """
+    Runs a sliding window workload on the OA map (insert a new key, remove the oldest one) and reports the final
+    capacity and lookup time with in-place compaction enabled and disabled. Uses the built-in hash so that keys are
+    spread out and tombstones are rarely reused.
+    """
+    print("\nOA insert/delete churn, 2000 live keys, 50000 rounds")
+    print("----------------------------------------------------")
+    print(f"{'compact_ratio':>13} {'capacity':>9} {'tombstones':>11} {'get ms':>8}")
+    for ratio in (0.5, 0.25, None):
+        m = hash_map_oa.HashMap(11, hash, compact_ratio=ratio)
+        for i in range(50000):
+            m.put('key' + str(i), i)
+            if i >= 2000:
+                m.remove('key' + str(i - 2000))
+        live = ['key' + str(i) for i in range(48000, 50000)]
+        get = _best_time(lambda: m, lambda mp: [mp.get(key) for key in live])
+        print(f"{str(ratio):>13} {m.get_capacity():>9} {m._tombstones:>11} {get * 1000:>8.2f}")
+
+
+def bench_hash_many() -> None:
+    """
+    Compares hashing a batch of keys one at a time against the vectorized hash_many().
+    """
+    print("\nscalar hashing vs hash_many(), 20000 keys")
+    print("-----------------------------------------")
+    print(f"{'function':>15} {'key length':>10} {'scalar ms':>10} {'batch ms':>9} {'speedup':>8}")
+    for function in (hash_function_1, hash_function_2):
+        for length in (8, 64, 256):
+            keys = [str(i).rjust(length, 'k') for i in range(20000)]
+            scalar = _best_time(lambda: keys, lambda ks: [function(k) for k in ks])
+            batch = _best_time(lambda: keys, lambda ks: hash_many(ks, function))
+            print(f"{function.__name__:>15} {length:>10} {scalar * 1000:>10.2f} {batch * 1000:>9.2f} "
+                  f"{scalar / batch:>7.1f}x")
+
+
+def bench_bulk_load() -> None:
+    """
+    Compares loading and reading a batch of pairs one put()/get() at a time against put_many()/get_many().
+    """
+    print("\nput()/get() loop vs put_many()/get_many(), 20000 pairs")
+    print("------------------------------------------------------")
+    print(f"{'map':>4} {'put ms':>8} {'put_many ms':>12} {'get ms':>8} {'get_many ms':>12}")
+    keys = _spread_keys(20000)
+    pairs = [(keys[i], i) for i in range(len(keys))]
+    for module in (hash_map_sc, hash_map_oa):
+        def put_loop(m):
+            for key, value in pairs:
+                m.put(key, value)
+
+        new = lambda: module.HashMap(11, hash_function_2)
+        put = _best_time(new, put_loop, 3)
+        put_many = _best_time(new, lambda m: m.put_many(pairs), 3)
+        get = _best_time(lambda: _filled(module, keys), lambda m: [m.get(key) for key in keys], 3)
+        get_many = _best_time(lambda: _filled(module, keys), lambda m: m.get_many(keys), 3)
+        print(f"{module.__name__[-2:].upper():>4} {put * 1000:>8.2f} {put_many * 1000:>12.2f} "
+              f"{get * 1000:>8.2f} {get_many * 1000:>12.2f}")
+
+
+def bench_compact_memory() -> None:
+    """
+    Compares the memory used per entry by the HashEntry based OA map and the array backed compact OA map.
+    """
+    print("\nOA memory per entry, HashEntry objects vs compact arrays")
+    print("--------------------------------------------------------")
+    print(f"{'keys':>7} {'HashEntry B':>12} {'compact B':>10} {'saved':>6}")
+    for count in (1000, 10000, 100000):
+        pairs = [(key, i) for i, key in enumerate(_spread_keys(count, 12))]
+        per_entry = []
+        for cls in (hash_map_oa.HashMap, hash_map_oa_compact.CompactHashMap):
+            def build():
+                m = cls(11, hash_function_2)
+                m.put_many(pairs)
+                return m
+            per_entry.append(_bytes_per_entry(build, count))
+        print(f"{count:>7} {per_entry[0]:>12.1f} {per_entry[1]:>10.1f} {1 - per_entry[1] / per_entry[0]:>6.0%}")
+
+
+def bench_slots_memory() -> None:
+    """
+    Memory report for the slots=True opt-in: bytes per entry with dict based and __slots__ based nodes/entries for
+    both maps. The SC figure includes the LinkedList objects of the buckets.
+    """
+    print("\nmemory per entry, instance dicts vs __slots__")
+    print("---------------------------------------------")
+    print(f"{'map':>4} {'keys':>7} {'dict B':>8} {'slots B':>8} {'saved':>6}")
+    for module in (hash_map_sc, hash_map_oa):
+        for count in (10000, 100000):
+            pairs = [(key, i) for i, key in enumerate(_spread_keys(count, 12))]
+            per_entry = []
+            for slots in (False, True):
+                def build():
+                    m = module.HashMap(11, hash_function_2, slots=slots)
+                    m.put_many(pairs)
+                    return m
+                per_entry.append(_bytes_per_entry(build, count))
+            print(f"{module.__name__[-2:].upper():>4} {count:>7} {per_entry[0]:>8.1f} {per_entry[1]:>8.1f} "
+                  f"{1 - per_entry[1] / per_entry[0]:>6.0%}")
+
+
+def bench_lazy_buckets() -> None:
+    """
+    Times constructing, clearing and doubling SC maps of growing capacity now that buckets are allocated lazily,
+    next to the cost of the eager LinkedList per bucket allocation they used to pay.
+    """
+    print("\nSC lazy buckets: construct / clear / resize of a half full table")
+    print("----------------------------------------------------------------")
+    print(f"{'capacity':>9} {'init ms':>8} {'clear ms':>9} {'resize ms':>10} {'eager lists ms':>15}")
+    for capacity in (10000, 100000, 1000000):
+        keys = _spread_keys(capacity // 2, 8)
+
+        def half_full():
+            m = hash_map_sc.HashMap(capacity, hash_function_2)
+            m.put_many([(key, None) for key in keys])
+            return m
+
+        init = _best_time(lambda: capacity, lambda c: hash_map_sc.HashMap(c, hash_function_2), 3)
+        clear = _best_time(half_full, lambda m: m.clear(), 3)
+        resize = _best_time(half_full, lambda m: m.resize_table(m.get_capacity() * 2), 3)
+        eager = _best_time(lambda: capacity, lambda c: [LinkedList() for _ in range(c)], 3)
+        print(f"{capacity:>9} {init * 1000:>8.2f} {clear * 1000:>9.2f} {resize * 1000:>10.2f} {eager * 1000:>15.2f}")
+
+
+def bench_stats_poll() -> None:
+    """
+    Times polling empty_buckets() and get_stats() on growing tables. Both read counters, so the time should not
+    depend on the capacity.
+    """
+    print("\nstatistics polling, 1000 calls")
+    print("------------------------------")
+    print(f"{'map':>4} {'capacity':>9} {'empty_buckets ms':>17} {'get_stats ms':>13}")
+    for module in (hash_map_sc, hash_map_oa):
+        for count in (1000, 100000):
+            m = _filled(module, _spread_keys(count, 8))
+            empty = _best_time(lambda: m, lambda mp: [mp.empty_buckets() for _ in range(1000)])
+            stats = _best_time(lambda: m, lambda mp: [mp.get_stats() for _ in range(1000)])
+            print(f"{module.__name__[-2:].upper():>4} {m.get_capacity():>9} {empty * 1000:>17.3f} "
+                  f"{stats * 1000:>13.3f}")
+
+
+def bench_put_latency() -> None:
+    """
+    Records the latency of every put() while loading 100000 keys, with stop-the-world and incremental resizing.
+    Incremental resizing spreads each rehash over the following operations: the resize spikes disappear from the
+    maximum at the cost of a busier p99. The garbage collector is paused so its own pauses do not mask the resizes.
+    """
+    print("\nput() latency while growing to 100000 keys, microseconds")
+    print("--------------------------------------------------------")
+    print(f"{'map':>4} {'incremental':>11} {'p50':>7} {'p99':>7} {'p99.9':>8} {'max':>10}")
+    keys = _spread_keys(100000, 12)
+    for module in (hash_map_sc, hash_map_oa):
+        for incremental in (False, True):
+            m = module.HashMap(11, hash_function_2, incremental=incremental)
+            latencies = []
+            gc.disable()
+            for i in range(len(keys)):
+                start = time.perf_counter_ns()
+                m.put(keys[i], i)
+                latencies.append(time.perf_counter_ns() - start)
+            gc.enable()
+            latencies.sort()
+            p50, p99, p999 = (latencies[int(len(latencies) * q)] / 1000 for q in (0.5, 0.99, 0.999))
+            print(f"{module.__name__[-2:].upper():>4} {str(incremental):>11} {p50:>7.1f} {p99:>7.1f} {p999:>8.1f} "
+                  f"{latencies[-1] / 1000:>10.1f}")
+
+
+def bench_capacity_mode() -> None:
+    """
+    Compares the default prime capacities with power_of_two=True, where the hash is mixed and reduced with a mask.
+    Sequential ASCII keys are included since mixing also breaks up the clusters the sample hash functions give them.
+    """
+    print("\nprime vs power of two capacities, 20000 keys")
+    print("--------------------------------------------")
+    print(f"{'map':>4} {'keys':>7} {'mode':>7} {'capacity':>9} {'put ms':>8} {'get ms':>8}")
+    key_sets = (('spread', _spread_keys(20000)), ('ascii', ['str' + str(i) for i in range(20000)]))
+    for module in (hash_map_sc, hash_map_oa):
+        for name, keys in key_sets:
+            for power_of_two in (False, True):
+                def put_loop(m):
+                    for key in keys:
+                        m.put(key, None)
+
+                def filled():
+                    m = module.HashMap(11, hash_function_2, power_of_two=power_of_two)
+                    put_loop(m)
+                    return m
+
+                put = _best_time(lambda: module.HashMap(11, hash_function_2, power_of_two=power_of_two), put_loop, 3)
+                m = filled()
+                get = _best_time(lambda: m, lambda mp: [mp.get(key) for key in keys], 3)
+                mode = 'pow2' if power_of_two else 'prime'
+                print(f"{module.__name__[-2:].upper():>4} {name:>7} {mode:>7} {m.get_capacity():>9} "
+                      f"{put * 1000:>8.2f} {get * 1000:>8.2f}")
+
+
+def bench_hash_functions() -> None:
+    """
+    Times every hash function of HASH_FUNCTIONS on its own, and a put()/get() round on both maps selected by name.
+    The stronger functions cost more per key but keep chains and probe sequences short, see hash_quality.py.
+    """
+    print("\nhash functions, 10000 \"user:<id>\" keys")
+    print("----------------------------------------")
+    print(f"{'function':>16} {'hash ms':>8} {'SC put+get ms':>14} {'OA put+get ms':>14}")
+    keys = ['user:' + str(i) for i in range(10000)]
+    for name, function in HASH_FUNCTIONS.items():
+        hashing = _best_time(lambda: keys, lambda ks: [function(key) for key in ks], 3)
+        row = []
+        for module in (hash_map_sc, hash_map_oa):
+            def round_trip(m):
+                for key in keys:
+                    m.put(key, None)
+                for key in keys:
+                    m.get(key)
+
+            row.append(_best_time(lambda: module.HashMap(11, name), round_trip, 1))
+        print(f"{name:>16} {hashing * 1000:>8.2f} {row[0] * 1000:>14.2f} {row[1] * 1000:>14.2f}")
+
+
+def bench_treeify() -> None:
+    """
+    Compares plain LinkedList chains with treeify_threshold=8 on the SC map under skewed and adversarial keys.
+    The skewed keys are sequential ASCII strings, which hash_function_2 packs into a narrow range of hashes. The
+    adversarial keys are permutations of one string, so hash_function_1 sends every one of them to the same bucket.
+    """
+    print("\nSC chains vs treeified buckets")
+    print("------------------------------")
+    print(f"{'keys':>12} {'count':>6} {'threshold':>10} {'longest':>8} {'put ms':>8} {'get ms':>8} {'remove ms':>10}")
+    anagrams = [''.join(letters) for letters in itertools.islice(itertools.permutations('abcdefgh'), 3000)]
+    corpora = (
+        ('skewed', hash_function_2, ['str' + str(i) for i in range(20000)]),
+        ('adversarial', hash_function_1, anagrams),
+    )
+    for name, function, keys in corpora:
+        for threshold in (None, 8):
+            def put_loop(m):
+                for key in keys:
+                    m.put(key, None)
+
+            def filled():
+                m = hash_map_sc.HashMap(11, function, treeify_threshold=threshold)
+                put_loop(m)
+                return m
+
+            put = _best_time(lambda: hash_map_sc.HashMap(11, function, treeify_threshold=threshold), put_loop, 3)
+            m = filled()
+            get = _best_time(lambda: m, lambda mp: [mp.get(key) for key in keys], 3)
+            remove = _best_time(filled, lambda mp: [mp.remove(key) for key in keys], 3)
+            print(f"{name:>12} {len(keys):>6} {str(threshold):>10} {m.get_stats()['longest_chain']:>8} "
+                  f"{put * 1000:>8.2f} {get * 1000:>8.2f} {remove * 1000:>10.2f}")
+
+
+def bench_zipf_reorder() -> None:
+    """
+    Replays a Zipf distributed read workload on the SC map with each reorder mode and reports the average number of
+    nodes a get() compares against. hash_function_1 gives the keys long chains, the popular keys are spread through
+    them at random. Move-to-front pulls the hot keys to the head of their chains at once, transpose only one
+    step per hit.
+    """
+    print("\nSC reorder modes under a Zipf(1.1) workload, 2000 keys, 100000 gets")
+    print("-------------------------------------------------------------------")
+    print(f"{'reorder':>14} {'longest':>8} {'comparisons/get':>16} {'get ms':>8}")
+    rand = random.Random(2000)
+    keys = ['key' + str(i) for i in range(2000)]
+    insert_order = rand.sample(keys, len(keys))
+    by_popularity = rand.sample(keys, len(keys))
+    weights = [1 / rank ** 1.1 for rank in range(1, len(keys) + 1)]
+    lookups = rand.choices(by_popularity, weights, k=100000)
+
+    def filled(reorder):
+        m = hash_map_sc.HashMap(11, hash_function_1, reorder=reorder)
+        for key in insert_order:
+            m.put(key, None)
+        return m
+
+    for reorder in (None, 'move_to_front', 'transpose'):
+        # Count the comparisons by finding each key's position in its chain right before the get()
+        m = filled(reorder)
+        comparisons = 0
+        for key in lookups:
+            bucket = m._buckets[m._reduce(m._hash(key), m.get_capacity())]
+            for node in bucket:
+                comparisons += 1
+                if node.key == key:
+                    break
+            m.get(key)
+
+        get = _best_time(lambda: filled(reorder), lambda mp: [mp.get(key) for key in lookups], 3)
+        print(f"{str(reorder):>14} {m.get_stats()['longest_chain']:>8} {comparisons / len(lookups):>16.2f} "
+              f"{get * 1000:>8.2f}")
+
+
+def bench_robin_hood() -> None:
+    """
+    Compares the quadratic probing OA map at its fixed 0.5 load with the Robin Hood map at higher loads: capacity
+    and memory for the same keys (in total and for the table alone, the HashEntry objects are the same for both),
+    put/get/miss times, and the mean and longest probe sequence of the stored keys. 24000 keys fit the capacity
+    growth reaches from 11 (25717) at a 0.95 load but not at 0.85, so the two Robin Hood rows end at different sizes.
+    """
+    print("\nquadratic probing vs Robin Hood, 24000 keys")
+    print("-------------------------------------------")
+    print(f"{'map':>10} {'load':>5} {'capacity':>9} {'B/entry':>8} {'table B/entry':>14} {'put ms':>8} {'get ms':>8} "
+          f"{'miss ms':>8} {'mean probe':>11} {'max probe':>10}")
+    keys = _spread_keys(24000, 12)
+    misses = _spread_keys(24001, 12)
+    pairs = [(key, None) for key in keys]
+    maps = (
+        ('quadratic', 0.5, lambda: hash_map_oa.HashMap(11, hash_function_2)),
+        ('robin hood', 0.85, lambda: hash_map_rh.RobinHoodHashMap(11, hash_function_2)),
+        ('robin hood', 0.95, lambda: hash_map_rh.RobinHoodHashMap(11, hash_function_2, max_load=0.95)),
+    )
+    for name, load, new in maps:
+        def put_loop(m):
+            for key in keys:
+                m.put(key, None)
+
+        def filled():
+            m = new()
+            put_loop(m)
+            return m
+
+        per_entry = _bytes_per_entry(lambda: filled(), len(keys))
+        put = _best_time(new, put_loop, 3)
+        m = filled()
+        get = _best_time(lambda: m, lambda mp: [mp.get(key) for key in keys], 3)
+        miss = _best_time(lambda: m, lambda mp: [mp.get(key) for key in misses], 3)
+
+        # Bucket array alone, plus the probe distances of the Robin Hood map
+        table = sys.getsizeof(m._buckets._data)
+
+        # Buckets visited by a successful lookup of each stored key
+        if isinstance(m, hash_map_rh.RobinHoodHashMap):
+            table += sys.getsizeof(m._distances)
+            probes = [distance + 1 for distance in m._distances if distance >= 0]
+        else:
+            probes = []
+            for i in range(m.get_capacity()):
+                if m._buckets[i] is not None:
+                    j = 1
+                    while (m._buckets[i].hash + (j - 1) ** 2) % m.get_capacity() != i:
+                        j += 1
+                    probes.append(j)
+
+        print(f"{name:>10} {load:>5} {m.get_capacity():>9} {per_entry:>8.1f} {table / len(keys):>14.1f} "
+              f"{put * 1000:>8.2f} {get * 1000:>8.2f} {miss * 1000:>8.2f} {sum(probes) / len(probes):>11.2f} "
+              f"{max(probes):>10}")
+
+
+def bench_insert_heavy() -> None:
+    """
+    Times insert-heavy workloads on the OA maps, whose put() finds the key or its insertion bucket in a single probe
+    walk: loading fresh keys, and a sliding window that inserts a key and removes an older one on every step, so
+    new keys keep landing on tombstones.
+    """
+    print("\ninsert-heavy workloads, 50000 keys")
+    print("----------------------------------")
+    print(f"{'map':>15} {'load ms':>8} {'window ms':>10}")
+    keys = _spread_keys(50000, 12)
+
+    def load(m):
+        for key in keys:
+            m.put(key, None)
+
+    def window(m):
+        for i in range(len(keys)):
+            m.put(keys[i], i)
+            if i >= 1000:
+                m.remove(keys[i - 1000])
+
+    for cls in (hash_map_oa.HashMap, hash_map_oa_compact.CompactHashMap):
+        new = lambda: cls(11, hash_function_2)
+        print(f"{cls.__name__:>15} {_best_time(new, load, 3) * 1000:>8.2f} {_best_time(new, window, 3) * 1000:>10.2f}")
+
+
+def bench_load_factor() -> None:
+    """
+    Shows the memory/latency tradeoff of max_load on both maps, then the effect of min_load after a purge: without
+    it the table keeps its peak capacity and get_keys_and_values() still walks every bucket.
+    """
+    print("\nmax_load, 20000 keys")
+    print("--------------------")
+    print(f"{'map':>4} {'max_load':>9} {'capacity':>9} {'B/entry':>8} {'put ms':>8} {'get ms':>8}")
+    keys = _spread_keys(20000, 12)
+    pairs = [(key, None) for key in keys]
+    settings = (
+        (hash_map_sc, (0.5, 1, 2, 4), {}),
+        (hash_map_oa, (0.25, 0.5, 0.75, 0.9), {'power_of_two': True}),
+    )
+    for module, loads, options in settings:
+        for max_load in loads:
+            new = lambda: module.HashMap(11, hash_function_2, max_load=max_load, **options)
+
+            def put_loop(m):
+                for key in keys:
+                    m.put(key, None)
+
+            def build():
+                m = new()
+                m.put_many(pairs)
+                return m
+
+            per_entry = _bytes_per_entry(build, len(keys))
+            put = _best_time(new, put_loop, 3)
+            m = build()
+            get = _best_time(lambda: m, lambda mp: [mp.get(key) for key in keys], 3)
+            print(f"{module.__name__[-2:].upper():>4} {max_load:>9} {m.get_capacity():>9} {per_entry:>8.1f} "
+                  f"{put * 1000:>8.2f} {get * 1000:>8.2f}")
+
+    print("\npurge 19900 of 20000 keys")
+    print("-------------------------")
+    print(f"{'map':>4} {'min_load':>9} {'capacity':>9} {'remove ms':>10} {'get_keys_and_values ms':>23}")
+    for module in (hash_map_sc, hash_map_oa):
+        for min_load in (None, 0.1):
+            def filled():
+                m = module.HashMap(11, hash_function_2, min_load=min_load)
+                m.put_many(pairs)
+                return m
+
+            remove = _best_time(filled, lambda mp: [mp.remove(key) for key in keys[100:]], 3)
+            m = filled()
+            m.remove_many(keys[100:])
+            listing = _best_time(lambda: m, lambda mp: mp.get_keys_and_values())
+            print(f"{module.__name__[-2:].upper():>4} {str(min_load):>9} {m.get_capacity():>9} {remove * 1000:>10.2f} "
+                  f"{listing * 1000:>23.3f}")
+
+
+def bench_reserve() -> None:
+    """
+    Times put() loops into a map that grows as it goes against one built with expected_size and one that reserve()d
+    the room first, and shows how many resizes the up front sizing avoided.
+    """
+    print("\nreserve, 50000 keys")
+    print("-------------------")
+    print(f"{'map':>4} {'sizing':>14} {'put ms':>8} {'capacity':>9} {'resizes avoided':>16}")
+    keys = _spread_keys(50000, 12)
+    for module in (hash_map_sc, hash_map_oa, hash_map_rh):
+        make = getattr(module, 'RobinHoodHashMap', module.HashMap)
+
+        def reserved():
+            m = make(11, hash_function_2)
+            m.reserve(len(keys))
+            return m
+
+        sizings = (
+            ('grow', lambda: make(11, hash_function_2)),
+            ('expected_size', lambda: make(11, hash_function_2, expected_size=len(keys))),
+            ('reserve', reserved),
+        )
+        for name, new in sizings:
+            def put_loop(m):
+                for key in keys:
+                    m.put(key, None)
+                return m
+
+            put = _best_time(new, put_loop, 3)
+            m = put_loop(new())
+            print(f"{module.__name__[-2:].upper():>4} {name:>14} {put * 1000:>8.2f} {m.get_capacity():>9} "
+                  f"{m.get_stats()['resizes_avoided']:>16}")
+
+
+def bench_iteration() -> None:
+    """
+    Compares a traversal through get_keys_and_values(), which copies every pair into a DynamicArray first, with one
+    through the items() generator: peak memory traced during the loop and its time.
+    """
+    print("\ntraversal, 200000 keys")
+    print("----------------------")
+    print(f"{'map':>4} {'source':>20} {'peak KiB':>9} {'ms':>8}")
+    pairs = [(key, i) for i, key in enumerate(_spread_keys(200000, 12))]
+    for module in (hash_map_sc, hash_map_oa):
+        m = module.HashMap(11, hash_function_2)
+        m.put_many(pairs)
+
+        def listed(mp):
+            result = mp.get_keys_and_values()
+            for i in range(result.length()):
+                key, value = result[i]
+
+        def generated(mp):
+            for key, value in mp.items():
+                pass
+
+        for name, walk in (('get_keys_and_values', listed), ('items', generated)):
+            tracemalloc.start()
+            walk(m)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            elapsed = _best_time(lambda: m, walk, 3)
+            print(f"{module.__name__[-2:].upper():>4} {name:>20} {peak / 1024:>9.1f} {elapsed * 1000:>8.2f}")
+
+
+def bench_version_cache() -> None:
+    """
+    Polls a derived result, the sorted key list, while an occasional put() changes the map: rebuilt on every poll
+    against cached and rebuilt only when get_version() changed.
+    """
+    print("\nsorted keys polled 200 times, a put every 50 polls, 20000 keys")
+    print("---------------------------------------------------------------")
+    print(f"{'map':>4} {'recompute ms':>13} {'versioned ms':>13}")
+    keys = _spread_keys(20000, 12)
+    for module in (hash_map_sc, hash_map_oa):
+        def workload(m, cached):
+            version, result = None, None
+            for poll in range(200):
+                if poll % 50 == 49:
+                    m.put('new' + str(poll), poll)
+                if not cached or m.get_version() != version:
+                    version, result = m.get_version(), sorted(m.keys())
+
+        plain = _best_time(lambda: _filled(module, keys), lambda m: workload(m, False), 3)
+        versioned = _best_time(lambda: _filled(module, keys), lambda m: workload(m, True), 3)
+        print(f"{module.__name__[-2:].upper():>4} {plain * 1000:>13.2f} {versioned * 1000:>13.2f}")
+
+
+def bench_threads() -> None:
+    """
+    Aggregate throughput of a read-mostly workload (90% get, 10% put) spread over a growing number of threads:
+    ConcurrentHashMap against a plain SC HashMap behind one global lock. With the GIL only one thread runs Python
+    code at a time, so what striping and lock-free gets buy there is less waiting, not parallelism.
+    """
+    title = f"threads, 90% get / 10% put, 200000 ops per run, {sys.getswitchinterval() * 1000:g} ms switch interval"
+    print("\n" + title)
+    print("-" * len(title))
+    print(f"{'threads':>8} {'global lock kops/s':>19} {'striped kops/s':>15}")
+    keys = _spread_keys(20000, 12)
+    total = 200000
+
+    class Locked:
+        def __init__(self):
+            self.map = hash_map_sc.HashMap(11, hash_function_2)
+            self.lock = threading.Lock()
+
+        def put(self, key, value):
+            with self.lock:
+                self.map.put(key, value)
+
+        def get(self, key):
+            with self.lock:
+                return self.map.get(key)
+
+    def run(m, threads):
+        def worker(seed):
+            rnd = random.Random(seed)
+            for _ in range(total // threads):
+                key = keys[rnd.randrange(len(keys))]
+                if rnd.random() < 0.1:
+                    m.put(key, seed)
+                else:
+                    m.get(key)
+
+        workers = [threading.Thread(target=worker, args=(seed,)) for seed in range(threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+
+    def filled(build):
+        m = build()
+        for key in keys[::2]:
+            m.put(key, None)
+        return m
+
+    for threads in (1, 2, 4, 8, 16):
+        locked = _best_time(lambda: filled(Locked), lambda m: run(m, threads), 3)
+        striped = _best_time(lambda: filled(lambda: hash_map_concurrent.ConcurrentHashMap(11, hash_function_2)),
+                             lambda m: run(m, threads), 3)
+        print(f"{threads:>8} {total / locked / 1000:>19.1f} {total / striped / 1000:>15.1f}")
+
+
+def bench_shards() -> None:
+    """
+    Aggregate throughput of put_many() followed by get_many() over 200000 keys as the number of shard processes
+    grows, against a single in-process SC HashMap. Process start-up is not timed. The shards can only run in
+    parallel with as many cores.
+    """
+    title = f"shards, put_many + get_many of 200000 keys, {os.cpu_count()} cores"
+    print("\n" + title)
+    print("-" * len(title))
+    print(f"{'shards':>10} {'kops/s':>9}")
+    keys = _spread_keys(200000, 12)
+    pairs = [(key, i) for i, key in enumerate(keys)]
+
+    def workload(m):
+        m.put_many(pairs)
+        m.get_many(keys)
+
+    elapsed = _best_time(lambda: hash_map_sc.HashMap(11, hash_function_2), workload, 3)
+    print(f"{'in-process':>10} {2 * len(keys) / elapsed / 1000:>9.1f}")
+
+    for shards in (1, 2, 4, 8):
+        maps = []
+
+        def sharded():
+            maps.append(hash_map_sharded.ShardedHashMap(shards, 11, hash_function_2))
+            return maps[-1]
+
+        elapsed = _best_time(sharded, workload, 3)
+        for m in maps:
+            m.close()
+        print(f"{shards:>10} {2 * len(keys) / elapsed / 1000:>9.1f}")
+
+
+def bench_shared_table() -> None:
+    """
+    What every worker process pays for a read-only lookup table of 100000 keys: rebuilding a hash_map_oa.HashMap
+    against attaching to a SharedHashMap built once by the writer. Memory is the table per worker for the former
+    and the shared block, once for all workers, for the latter.
+    """
+    print("\nread-only table, 100000 keys, per worker")
+    print("---------------------------------------")
+    print(f"{'table':>14} {'startup ms':>11} {'MiB':>7} {'get ms':>8}")
+    keys = _spread_keys(100000, 12)
+    pairs = [(key, i) for i, key in enumerate(keys)]
+
+    def build():
+        m = hash_map_oa.HashMap(11, hash_function_2)
+        m.put_many(pairs)
+        return m
+
+    startup = _best_time(lambda: None, lambda _: build(), 3)
+    size = _bytes_per_entry(build, 1)
+    m = build()
+    get = _best_time(lambda: m, lambda mp: [mp.get(key) for key in keys], 3)
+    print(f"{'OA rebuilt':>14} {startup * 1000:>11.2f} {size / 2 ** 20:>7.1f} {get * 1000:>8.2f}")
+
+    with hash_map_shm.SharedHashMap.create(pairs, hash_function_2) as shared:
+        attached = []
+        startup = _best_time(lambda: None, lambda _: attached.append(hash_map_shm.SharedHashMap(shared.name)), 3)
+        for m in attached:
+            m.close()
+        size = shared._memory.size
+        get = _best_time(lambda: shared, lambda mp: [mp.get(key) for key in keys], 3)
+        print(f"{'shared attach':>14} {startup * 1000:>11.2f} {size / 2 ** 20:>7.1f} {get * 1000:>8.2f}")
+
+
+BENCHMARKS = {
+    'resize_key_length': bench_resize_key_length,
+    'rehash_engine': bench_rehash_engine,
+    'tombstone_churn': bench_tombstone_churn,
+    'hash_many': bench_hash_many,
+    'bulk_load': bench_bulk_load,
+    'compact_memory': bench_compact_memory,
+    'slots_memory': bench_slots_memory,
+    'lazy_buckets': bench_lazy_buckets,
+    'stats_poll': bench_stats_poll,
+    'put_latency': bench_put_latency,
+    'capacity_mode': bench_capacity_mode,
+    'hash_functions': bench_hash_functions,
+    'treeify': bench_treeify,
+    'zipf_reorder': bench_zipf_reorder,
+    'robin_hood': bench_robin_hood,
+    'insert_heavy': bench_insert_heavy,
+    'load_factor': bench_load_factor,
+    'reserve': bench_reserve,
+    'iteration': bench_iteration,
+    'version_cache': bench_version_cache,
+    'threads': bench_threads,
+    'shards': bench_shards,
+    'shared_table': bench_shared_table,
+}
+
+
+if __name__ == "__main__":
+    for name in sys.argv[1:] or BENCHMARKS:
+        BENCHMARKS[name]()
@@ -0,0 +1,353 @@
+# Course: CS261 - Data Structures
+# Assignment: 6
+# Description: Thread-safe separate chaining hash map. The bucket array is split into stripes of consecutive buckets,
+#              each guarded by its own lock, so puts and removes in different stripes do not wait for each other.
+#              Resizes, reseeds and clear() lock every stripe. get() and contains_key() normally take no lock at all:
+#              they read the chain and then check that no writer touched it meanwhile.
+#              Same public API as hash_map_sc.HashMap.
+
+import sys
+import threading
+from contextlib import contextmanager
+
+from a6_include import DynamicArray, hash_function_1, hash_function_2, to_list
+from hash_map_sc import HashMap
+
+# Reading a chain while another thread relinks it is only safe while the GIL serializes the bytecodes. A free-threaded
+# build reports the GIL as disabled, gets then lock their stripe like puts do.
+_LOCK_FREE_READS = getattr(sys, '_is_gil_enabled', lambda: True)()
+
+
+class ConcurrentHashMap(HashMap):
+    def __init__(self, capacity: int = 11, function=hash_function_1, stripes: int = 16, slots: bool = False,
+                 power_of_two: bool = False, seed: int = None, flood_limit: int = 16, stats_hook: callable = None,
+                 treeify_threshold: int = None, max_load: float = 1, growth_factor: float = 2,
+                 expected_size: int = None) -> None:
+        """
+        Initialize new HashMap that uses
+        separate chaining for collision resolution and can be shared between threads
+
+        stripes is the number of locks, each guarding an equal range of the bucket array. More stripes let more
+        writers run at once but make resizes, which take all of them, slower.
+        slots, power_of_two, seed, flood_limit, stats_hook, treeify_threshold, max_load, growth_factor and
+        expected_size work as for hash_map_sc.HashMap. Incremental resizing, reorder modes (which would make every
+        get() a write) and shrinking are not supported.
+        """
+        if stripes < 1:
+            raise ValueError("stripes must be at least 1")
+
+        # RLocks, so that the stats hook of a reseed can call get_stats() while every stripe is locked
+        self._locks = [threading.RLock() for _ in range(stripes)]
+        self._sizes = [0] * stripes     # keys per stripe, each only written under its lock
+        self._writes = [0] * stripes    # odd while a put is relinking the stripe's chains, see _lookup()
+        self._rebuilds = 0              # odd while _exclusive() is rebuilding the table
+
+        super().__init__(capacity, function, slots=slots, power_of_two=power_of_two, seed=seed,
+                         flood_limit=flood_limit, stats_hook=stats_hook, treeify_threshold=treeify_threshold,
+                         max_load=max_load, growth_factor=growth_factor, expected_size=expected_size)
+
+    @property
+    def _size(self) -> int:
+        """
+        Number of keys. It is kept per stripe, as two threads adding to one counter can lose an update.
+        """
+        return sum(self._sizes)
+
+    @_size.setter
+    def _size(self, size: int) -> None:
+        """
+        Resets the number of keys, only done while every stripe is locked
+        """
+        self._sizes = [size] + [0] * (len(self._locks) - 1)
+
+    @property
+    def _version(self) -> int:
+        """
+        Modification count, see hash_map_sc.HashMap.get_version(). Puts and removes are counted per stripe and
+        rebuilds by _rebuilds.
+        """
+        return sum(self._writes) + self._rebuilds
+
+    @_version.setter
+    def _version(self, version: int) -> None:
+        """
+        The base class bumps _version whenever it rebuilds the table, which only happens inside _exclusive(), and
+        that already counts it
+        """
+
+    def _stripe(self, index: int, capacity: int) -> int:
+        """
+        Returns the stripe of the bucket at index in a table of the given capacity
+        """
+        return index * len(self._locks) // capacity
+
+    @contextmanager
+    def _all_stripes(self):
+        """
+        Context manager holding every stripe lock. They are always taken in the same order, so two threads doing
+        this cannot deadlock, and a thread never asks for them while it holds a single stripe.
+        """
+        for lock in self._locks:
+            lock.acquire()
+        try:
+            yield
+        finally:
+            for lock in reversed(self._locks):
+                lock.release()
+
+    @contextmanager
+    def _exclusive(self):
+        """
+        Context manager holding every stripe lock for a rebuild of the table. _rebuilds is odd for the duration,
+        which tells lock-free readers that chains are being relinked.
+        """
+        with self._all_stripes():
+            self._rebuilds += 1
+            try:
+                yield
+            finally:
+                self._rebuilds += 1
+
+    def _lock_bucket(self, key: str) -> tuple:
+        """
+        Hashes key and acquires the lock of the stripe its bucket is in. Returns (hash, index, stripe), the caller
+        must release the lock. A rebuild between the hashing and the locking may have moved the key, or changed the
+        hash function, so then it starts over.
+        """
+        while True:
+            buckets = self._buckets
+            hash = self._hash(key)
+            index = self._reduce(hash, buckets.length())
+            stripe = self._stripe(index, buckets.length())
+
+            lock = self._locks[stripe]
+            lock.acquire()
+            if self._buckets is buckets:
+                return hash, index, stripe
+            lock.release()
+
+    # ------------------------------------------------------------------ #
+
+    def put(self, key: str, value: object) -> None:
+        """
+        Puts the key value pair in the hash map. If the key already exists, the value is updated.
+        """
+        if self.table_load() >= self._max_load:
+            with self._exclusive():
+                # Another thread may have grown the table while this one waited for the locks
+                if self.table_load() >= self._max_load:
+                    super().resize_table(self._grown(self._capacity))
+
+        hash, index, stripe = self._lock_bucket(key)
+        try:
+            flooded = self._put_locked(key, value, hash, index, stripe)
+        finally:
+            self._locks[stripe].release()
+
+        if flooded:
+            self._reseed()
+
+    def _put_locked(self, key: str, value: object, hash: int, index: int, stripe: int) -> bool:
+        """
+        Puts the key value pair into the bucket at index, whose stripe lock the caller holds. Returns True if the
+        chain grew past flood_limit.
+        """
+        bucket = self._buckets[index]
+        node = None if bucket is None else bucket.contains(key, hash)
+        if node is not None:
+            # Updating a value relinks nothing
+            node.value = value
+            return False
+
+        self._writes[stripe] += 1
+        if bucket is None:
+            bucket = self._list_class()
+            self._buckets[index] = bucket
+        bucket.insert(key, value, hash)
+        self._sizes[stripe] += 1
+        self._fit_bucket(self._buckets, index)
+        self._writes[stripe] += 1
+
+        return self._flood_limit is not None and bucket.length() > self._flood_limit
+
+    def _reseed(self) -> None:
+        """
+        Switches to a new random seed and rehashes, see hash_map_sc.HashMap._reseed(), with every stripe locked
+        """
+        with self._exclusive():
+            super()._reseed()
+
+    def put_many(self, pairs) -> None:
+        """
+        Puts every (key, value) pair of an iterable or DynamicArray in the hash map. The table is grown at most once,
+        up front, to fit the whole batch.
+        """
+        pairs = to_list(pairs)
+        with self._exclusive():
+            self._presize(len(pairs))
+
+        for key, value in pairs:
+            self.put(key, value)
+
+    def reserve(self, count: int) -> None:
+        """
+        Grows the table up front, see hash_map_sc.HashMap.reserve(), with every stripe locked
+        """
+        with self._exclusive():
+            super().reserve(count)
+
+    def resize_table(self, new_capacity: int) -> None:
+        """
+        Resizes the hash table, see hash_map_sc.HashMap.resize_table(), with every stripe locked
+        """
+        with self._exclusive():
+            super().resize_table(new_capacity)
+
+    def clear(self) -> None:
+        """
+        Clears the contents of the hash map. Does not change the hash table capacity
+        """
+        with self._exclusive():
+            super().clear()
+
+    def _lookup(self, key: str):
+        """
+        Returns the node of the specified key, or None if the key is not in the map. Reads a LinkedList chain
+        without a lock, then checks that neither a rebuild nor a put into the same stripe relinked nodes meanwhile,
+        like a seqlock. Only if one did, or the bucket is a TreeBucket (whose lists are not updated together), does
+        it lock the stripe and look again.
+        """
+        if _LOCK_FREE_READS:
+            rebuilds = self._rebuilds
+            buckets = self._buckets
+            hash = self._hash(key)
+            index = self._reduce(hash, buckets.length())
+            stripe = self._stripe(index, buckets.length())
+            writes = self._writes[stripe]
+
+            bucket = buckets[index]
+            if (rebuilds | writes) & 1 == 0 and (bucket is None or type(bucket) is self._list_class):
+                node = None if bucket is None else bucket.contains(key, hash)
+                if self._rebuilds == rebuilds and self._writes[stripe] == writes:
+                    return node
+
+        hash, index, stripe = self._lock_bucket(key)
+        try:
+            bucket = self._buckets[index]
+            return None if bucket is None else bucket.contains(key, hash)
+        finally:
+            self._locks[stripe].release()
+
+    def get(self, key: str):
+        """
+        Returns the value associated with the specified key. If the key is not in the hash, returns None
+        """
+        node = self._lookup(key)
+        return None if node is None else node.value
+
+    def get_many(self, keys) -> DynamicArray:
+        """
+        Returns a dynamic array with the value of each key of an iterable or DynamicArray, None for missing keys
+        """
+        result_array = DynamicArray()
+        for key in to_list(keys):
+            result_array.append(self.get(key))
+
+        return result_array
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Returns True if the specified key is in the hash map. Returns False otherwise
+        """
+        return self._lookup(key) is not None
+
+    def remove(self, key: str) -> None:
+        """
+        Removes the specified key from the hash map
+        """
+        hash, index, stripe = self._lock_bucket(key)
+        try:
+            bucket = self._buckets[index]
+            if bucket is None or bucket.remove(key, hash) is False:
+                return
+
+            # Unlinking one node leaves the chain readable, only turning a TreeBucket back into a list needs the
+            # readers to look again
+            self._writes[stripe] += 1
+            self._sizes[stripe] -= 1
+            if bucket.length() == 0:
+                self._buckets[index] = None
+            else:
+                self._fit_bucket(self._buckets, index)
+            self._writes[stripe] += 1
+        finally:
+            self._locks[stripe].release()
+
+    def remove_many(self, keys) -> None:
+        """
+        Removes every key of an iterable or DynamicArray from the hash map
+        """
+        for key in to_list(keys):
+            self.remove(key)
+
+    def _recount(self) -> None:
+        """
+        Recounts the chain statistics, which puts and removes do not keep up to date since they would all have to
+        write the same counters. Every stripe must be locked.
+        """
+        self._occupied = 0
+        self._chain_lengths = {}
+        self._longest_chain = 0
+        for bucket in self._buckets:
+            if bucket is not None:
+                self._occupied += 1
+                self._chain_resized(0, bucket.length())
+
+    def empty_buckets(self) -> int:
+        """
+        Returns the number of empty buckets in the hash table. Counts them with every stripe locked.
+        """
+        with self._all_stripes():
+            self._recount()
+            return self._capacity - self._occupied
+
+    def get_stats(self) -> dict:
+        """
+        Returns a snapshot of the map's statistics, see hash_map_sc.HashMap.get_stats(). Unlike there the chain
+        statistics are counted by walking the bucket array with every stripe locked, so this costs O(capacity).
+        """
+        with self._all_stripes():
+            self._recount()
+            stats = super().get_stats()
+        stats['stripes'] = len(self._locks)
+        return stats
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """
+        Returns a dynamic array containing all key/value pairs stored in the hash map, copied with every stripe
+        locked
+        """
+        with self._all_stripes():
+            return super().get_keys_and_values()
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    print("\nConcurrent - put from 8 threads")
+    print("-------------------------------")
+    m = ConcurrentHashMap(11, hash_function_2)
+
+    def worker(first):
+        for i in range(first, first + 2000):
+            m.put('str' + str(i), i)
+        for i in range(first, first + 2000, 2):
+            m.remove('str' + str(i))
+
+    threads = [threading.Thread(target=worker, args=(n * 2000,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    print(m.get_size(), m.get_capacity(), m.get('str1'), m.get('str2'), m.contains_key('str15999'))
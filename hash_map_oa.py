@@ -5,26 +5,91 @@
 # Due Date: 2023/08/15
 # Description: Hash map implementation that uses open addressing for collision resolution
 
-from a6_include import (DynamicArray, DynamicArrayException, HashEntry,
-                        hash_function_1, hash_function_2)
+from math import ceil
+
+from a6_include import (DynamicArray, HashEntry, SEEDED_HASH_FUNCTIONS, SlottedHashEntry, get_hash_function,
+                        hash_function_1, hash_function_2, hash_many, mix64, random_seed, seeded_hash_function, to_list)
+from prime_capacity import is_prime, next_prime
+
+# Left in the old bucket array in place of entries that were migrated to the new one
+_MIGRATED = HashEntry(None, None)
+_MIGRATED.is_tombstone = True
 
 
 class HashMap:
-    def __init__(self, capacity: int, function) -> None:
+    # Highest max_load with prime capacities: quadratic probing is only sure to reach an empty bucket of a prime
+    # capacity table while at most half of the buckets are in use
+    _prime_load_limit = 0.5
+
+    # max_load that the flood_limit argument is meant for, see _scaled_flood_limit()
+    _flood_limit_load = 0.5
+
+    def __init__(self, capacity: int, function, compact_ratio: float = 0.5, slots: bool = False,
+                 incremental: bool = False, migrate_step: int = 16, power_of_two: bool = False, seed: int = None,
+                 flood_limit: int = 32, stats_hook=None, max_load: float = 0.5, min_load: float = None,
+                 growth_factor: float = 2, expected_size: int = None) -> None:
         """
         Initialize new HashMap that uses
         quadratic probing for collision resolution
-        DO NOT CHANGE THIS METHOD IN ANY WAY
-        """
+
+        function is a hash function, or the name of one registered in a6_include.HASH_FUNCTIONS.
+        compact_ratio is the share of the occupied buckets that must be tombstones for a full table to be compacted
+        in place at the same capacity instead of doubled. None disables compaction.
+        slots=True stores the entries as __slots__ based SlottedHashEntry objects, which need less memory.
+        incremental=True replaces the stop-the-world rehash that put() triggers with a gradual one: the old and new
+        bucket arrays coexist and every put, get, contains_key and remove moves migrate_step old buckets over.
+        power_of_two=True uses power of two capacities instead of primes: hashes go through mix64(), buckets are
+        picked with a bit mask and collisions are resolved by triangular probing, which visits every bucket.
+        seed seeds the seeded hash functions (a6_include.SEEDED_HASH_FUNCTIONS, e.g. 'siphash'), a random one is
+        drawn for every map by default. With a seeded function a put() that probes more than flood_limit buckets is
+        taken as hash flooding: the map draws a new seed and rehashes, then calls stats_hook('reseed', get_stats())
+        if a hook is given. Unseeded functions cannot be reseeded, so they are never checked. flood_limit is the limit
+        at a max_load of 0.5, a higher max_load raises it in step with the average probe count. None disables the
+        check.
+        max_load is the share of the buckets that live entries and tombstones may fill before put() makes room,
+        growth_factor the factor the table grows by. Above 0.5 it needs power_of_two=True, since quadratic probing
+        over a prime capacity only reaches half of the buckets. min_load makes remove() shrink the table once the
+        load drops below it, to a capacity halfway between min_load and max_load and no smaller than the initial
+        capacity. It must be below max_load / growth_factor, so that a table that just grew does not shrink straight
+        back. None, the default, never shrinks.
+        expected_size starts the table at the capacity put() would have grown it to by the time it holds that many
+        keys, see reserve(). The table then never shrinks below that capacity either.
+        """
+        self._entry_class = SlottedHashEntry if slots else HashEntry
+        self._power_of_two = power_of_two
+        self._set_load_limits(max_load, min_load, growth_factor)
         self._buckets = DynamicArray()
 
-        # capacity must be a prime number
-        self._capacity = self._next_prime(capacity)
+        # capacity must be a prime number (or a power of two)
+        self._capacity = self._fit_capacity(capacity)
+        self._resizes_avoided = 0   # growths that reserve() and put_many() saved put() from doing one by one
+        if expected_size is not None:
+            self._capacity, self._resizes_avoided = self._reserved_capacity(self._capacity, expected_size)
+        self._min_capacity = self._capacity
         for _ in range(self._capacity):
             self._buckets.append(None)
 
-        self._hash_function = function
+        self._base_function = get_hash_function(function)
+        self._seed = random_seed() if seed is None else seed
+        self._hash_function = seeded_hash_function(self._base_function, self._seed)
         self._size = 0
+        self._tombstones = 0
+        self._compact_ratio = compact_ratio
+        self._version = 0           # bumped by every structural modification, see get_version()
+
+        # Hash flooding detection, only possible with a seeded hash function
+        self._flood_limit = self._scaled_flood_limit(flood_limit) if self._base_function in SEEDED_HASH_FUNCTIONS \
+            else None
+        self._stats_hook = stats_hook
+        self._reseeds = 0
+
+        # Incremental resizing, _old_buckets is None unless a migration is in progress
+        self._incremental = incremental
+        self._migrate_step = migrate_step
+        self._old_buckets = None
+        self._old_capacity = 0
+        self._old_size = 0          # live entries still waiting in the old array
+        self._migrate_index = 0
 
     def __str__(self) -> str:
         """
@@ -38,36 +103,70 @@ class HashMap:
 
     def _next_prime(self, capacity: int) -> int:
         """
-        Increment from given number to find the closest prime number
-        DO NOT CHANGE THIS METHOD IN ANY WAY
+        Find the closest prime number equal to or larger than the given number, see prime_capacity.next_prime()
         """
-        if capacity % 2 == 0:
-            capacity += 1
-
-        while not self._is_prime(capacity):
-            capacity += 2
-
-        return capacity
+        return next_prime(capacity)
 
     @staticmethod
     def _is_prime(capacity: int) -> bool:
         """
-        Determine if given integer is a prime number and return boolean
-        DO NOT CHANGE THIS METHOD IN ANY WAY
+        Determine if given integer is a prime number and return boolean, see prime_capacity.is_prime()
         """
-        if capacity == 2 or capacity == 3:
-            return True
+        return is_prime(capacity)
 
-        if capacity == 1 or capacity % 2 == 0:
-            return False
+    def _fit_capacity(self, capacity: int) -> int:
+        """
+        Returns the capacity to use for a table of at least the given size: the next prime number, or the next
+        power of two in power of two mode
+        """
+        if self._power_of_two:
+            return 1 << max(capacity - 1, 1).bit_length()
+        return self._next_prime(capacity)
 
-        factor = 3
-        while factor ** 2 <= capacity:
-            if capacity % factor == 0:
-                return False
-            factor += 2
+    def _set_load_limits(self, max_load: float, min_load: float, growth_factor: float) -> None:
+        """
+        Checks and stores the load factor limits and the growth factor
+        """
+        if not 0 < max_load < 1 or growth_factor <= 1:
+            raise ValueError("max_load must be between 0 and 1 and growth_factor larger than 1")
+        if max_load > self._prime_load_limit and not self._power_of_two:
+            raise ValueError(f"max_load can be at most {self._prime_load_limit} with prime capacities")
+        if min_load is not None and not 0 <= min_load < max_load / growth_factor:
+            raise ValueError("min_load must be at least 0 and below max_load / growth_factor")
 
-        return True
+        self._max_load = max_load
+        self._min_load = min_load
+        self._growth_factor = growth_factor
+
+    def _expected_probes(self, load: float) -> float:
+        """
+        Returns the average number of buckets a put() probes in a table at the given load. Quadratic and triangular
+        probing visit the buckets in an effectively random order, which takes 1 / (1 - load) probes.
+        """
+        return 1 / (1 - load)
+
+    def _scaled_flood_limit(self, flood_limit: int):
+        """
+        Returns flood_limit raised for a max_load above _flood_limit_load, by the factor the average probe count grows
+        by. The longest probe sequences of ordinary keys grow along with the average, and a fixed limit would have
+        them reseed over and over, each time rehashing the table without making any probe sequence shorter.
+        """
+        if flood_limit is None or self._max_load <= self._flood_limit_load:
+            return flood_limit
+        return ceil(flood_limit * self._expected_probes(self._max_load) / self._expected_probes(self._flood_limit_load))
+
+    def _grown(self, capacity: int) -> int:
+        """
+        Returns the capacity a table of the given capacity grows to
+        """
+        return self._fit_capacity(max(capacity + 1, int(capacity * self._growth_factor)))
+
+    def _hash(self, key: str) -> int:
+        """
+        Returns the full hash of key. In power of two mode it is mixed, since the mask only keeps its low bits.
+        """
+        hash = self._hash_function(key)
+        return mix64(hash) if self._power_of_two else hash
 
     def get_size(self) -> int:
         """
@@ -89,51 +188,291 @@ class HashMap:
         """
         Puts the key value pair in the hash map. If the key already exists, the value is updated.
         """
-        # Check if resize is necessary
-        if self.table_load() >= 0.5:
-            self.resize_table(self._capacity * 2)
+        if self._old_buckets is not None:
+            self._migrate(self._migrate_step)
 
-        # Check if the key already exists
-        hash_entry = self._find_key(key)
-        if hash_entry is not None:
+        # Check if resize is necessary, tombstones take up buckets in the probe sequences just like live entries
+        if (self._size + self._tombstones) / self._capacity >= self._max_load:
+            self._make_room()
+
+        self._put_hashed(key, value, self._hash(key))
+
+    def _put_hashed(self, key: str, value: object, hash: int) -> None:
+        """
+        Puts the key value pair given the full hash of the key. Does not check the load, the caller must make room.
+        """
+        # One walk of the probe sequence finds either the key or the bucket a new entry goes in
+        hash_value, found, probes = self._find_slot(self._buckets, self._capacity, key, hash)
+        if found:
             # Update the value and return
-            hash_entry.value = value
+            self._buckets[hash_value].value = value
+            return
+
+        # While migrating, the key may still be in the old array
+        if self._old_buckets is not None:
+            hash_entry = self._probe(self._old_buckets, self._old_capacity, key, hash)
+            if hash_entry is not None:
+                hash_entry.value = value
+                return
+
+        # Insert the new HashEntry
+        if self._buckets[hash_value] is not None:
+            # Reusing a tombstone
+            self._tombstones -= 1
+        self._buckets[hash_value] = self._entry_class(key, value, hash)
+        self._size += 1
+        self._version += 1
+
+        if self._flood_limit is not None and probes > self._flood_limit:
+            self._reseed()
+
+    def _reseed(self) -> None:
+        """
+        Switches to a new random seed, recomputes the cached hash of every entry and rehashes at the same capacity,
+        then reports the event to the stats hook
+        """
+        self._seed = random_seed()
+        self._hash_function = seeded_hash_function(self._base_function, self._seed)
+        self._reseeds += 1
+
+        sources = [self._buckets] if self._old_buckets is None else [self._buckets, self._old_buckets]
+        for buckets in sources:
+            for i in range(buckets.length()):
+                entry = buckets[i]
+                if entry is not None and entry.is_tombstone is False:
+                    entry.hash = self._hash(entry.key)
+        self._rehash(self._capacity)
+
+        if self._stats_hook is not None:
+            self._stats_hook('reseed', self.get_stats())
+
+    def put_many(self, pairs) -> None:
+        """
+        Puts every (key, value) pair of an iterable or DynamicArray in the hash map. The table is grown at most once,
+        up front, to fit the whole batch and the keys are hashed together.
+        """
+        pairs = to_list(pairs)
+        self._presize(len(pairs))
+
+        hashes = self._hash_keys([key for key, _ in pairs])
+        reseeds = self._reseeds
+        for i in range(len(pairs)):
+            if self._reseeds != reseeds:
+                # A reseed part way through the batch changed the hash function, hash the rest of the keys again
+                reseeds = self._reseeds
+                hashes[i:] = self._hash_keys([key for key, _ in pairs[i:]])
+            self._put_hashed(pairs[i][0], pairs[i][1], hashes[i])
+
+    def _presize(self, count: int) -> None:
+        """
+        Makes room for count more keys so that none of their puts crosses the load limit. Picks the capacity the
+        put() growths would have reached and rehashes once.
+        """
+        if count == 0 or (self._size + self._tombstones + count - 1) / self._capacity < self._max_load:
+            return
+
+        capacity, growths = self._reserved_capacity(self._capacity, self._size + count)
+        self._rehash(capacity)
+        # Tombstones alone can call for a rehash at the same capacity, which saves no growth
+        self._resizes_avoided += max(growths - 1, 0)
+
+    def _reserved_capacity(self, capacity: int, count: int) -> tuple:
+        """
+        Returns (capacity, growths): the capacity put() would have grown a table of the given capacity to by the time
+        it holds count keys, and the number of growths that took
+        """
+        growths = 0
+        while count > 0 and (count - 1) / capacity >= self._max_load:
+            capacity = self._grown(capacity)
+            growths += 1
+        return capacity, growths
+
+    def reserve(self, count: int) -> None:
+        """
+        Grows the table up front, in a single rehash, so that it can hold count keys in total without put()
+        resizing it. Does nothing if the table is already large enough.
+        """
+        if count > self._size:
+            self._presize(count - self._size)
+
+    def _shrink_if_sparse(self) -> None:
+        """
+        Shrinks the table after a removal if its load dropped below min_load. The new capacity puts the load halfway
+        between min_load and max_load, but is never below the initial capacity. Tombstones are dropped on the way.
+        """
+        if self._min_load is None or self._size / self._capacity >= self._min_load:
+            return
+
+        target = ceil(self._size / ((self._min_load + self._max_load) / 2))
+        capacity = self._fit_capacity(max(target, self._min_capacity))
+        if capacity >= self._capacity:
+            return
+
+        if self._old_buckets is not None:
+            # Still moving entries out of the previous array, finish that before starting over
+            self._migrate(self._old_capacity)
+
+        if self._incremental:
+            self._start_migration(capacity)
         else:
-            # Find an empty spot, insert the new HashEntry
-            hash_value = self._find_empty(key)
-            self._buckets[hash_value] = HashEntry(key, value)
-            self._size += 1
+            self._rehash(capacity)
 
-    def _find_key(self, key):
+    def _make_room(self) -> None:
+        """
+        Called when live entries and tombstones together reach the maximum load. If tombstones make up at least
+        compact_ratio of the occupied buckets the table is compacted in place, otherwise it grows. In incremental
+        mode this only starts a migration to the new bucket array.
+        """
+        if self._old_buckets is not None:
+            # Still moving entries out of the previous array, finish that before starting over
+            self._migrate(self._old_capacity)
+            if (self._size + self._tombstones) / self._capacity < self._max_load:
+                return
+
+        compact = self._compact_ratio is not None and \
+            self._tombstones >= self._compact_ratio * (self._size + self._tombstones)
+
+        if self._incremental:
+            self._start_migration(self._capacity if compact else self._grown(self._capacity))
+        elif compact:
+            self._rehash(self._capacity)
+        else:
+            self.resize_table(self._grown(self._capacity))
+
+    def _start_migration(self, new_capacity: int) -> None:
+        """
+        Swaps in an empty bucket array of the given (prime) capacity and keeps the current one around as the old
+        array, whose entries are moved over a few buckets at a time by _migrate()
+        """
+        self._old_buckets = self._buckets
+        self._old_capacity = self._capacity
+        self._old_size = self._size
+        self._migrate_index = 0
+
+        self._buckets = DynamicArray([None] * new_capacity)
+        self._capacity = new_capacity
+        self._tombstones = 0
+        self._version += 1
+
+    def _migrate(self, count: int) -> None:
+        """
+        Moves the live entries of the next count buckets of the old array into the new one. Moved entries leave a
+        tombstone behind, so the probe sequences of the entries that are still in the old array stay intact.
+        """
+        end = min(self._migrate_index + count, self._old_capacity)
+        for i in range(self._migrate_index, end):
+            entry = self._old_buckets[i]
+            if entry is None or entry.is_tombstone is True:
+                continue
+
+            hash_value, _ = self._find_empty(entry.hash)
+            if self._buckets[hash_value] is not None:
+                # Reusing a tombstone
+                self._tombstones -= 1
+            self._buckets[hash_value] = entry
+            self._old_buckets[i] = _MIGRATED
+            self._old_size -= 1
+
+        self._migrate_index = end
+        if end == self._old_capacity:
+            self._old_buckets = None
+
+    def _find_key(self, key, hash=None):
         """
         Returns the HashEntry of the specified key. If the entry does not exist, returns None
         """
-        # Get the hash
-        hash_value = self._hash_function(key) % self._capacity
+        # Get the hash, unless the caller has already computed it
+        if hash is None:
+            hash = self._hash(key)
+
+        hash_entry = self._probe(self._buckets, self._capacity, key, hash)
+
+        # While migrating, keys that were not moved yet are still in the old array
+        if hash_entry is None and self._old_buckets is not None:
+            hash_entry = self._probe(self._old_buckets, self._old_capacity, key, hash)
+
+        return hash_entry
+
+    def _probe(self, buckets: DynamicArray, capacity: int, key, hash: int):
+        """
+        Returns the live HashEntry of the specified key in the given bucket array, or None
+        """
+        hash_value, found, _ = self._find_slot(buckets, capacity, key, hash)
+        return buckets[hash_value] if found else None
+
+    def _find_slot(self, buckets: DynamicArray, capacity: int, key, hash: int) -> tuple:
+        """
+        Walks the probe sequence of the full hash in the given bucket array once and returns (index, found, probes).
+        If found is True, index is the bucket of the live entry of key. Otherwise it is the bucket a new entry for
+        key belongs in: the first tombstone passed, or else the empty bucket that ended the walk, and -1 if the walk
+        met neither. probes is the number of buckets visited to reach index.
+        """
+        tombstone, tombstone_probes = -1, 0
+
+        if self._power_of_two:
+            mask = capacity - 1
+            hash_value = hash & mask
+            j = 1
+            while True:
+                entry = buckets[hash_value]
+                if entry is None:
+                    return (tombstone, False, tombstone_probes) if tombstone >= 0 else (hash_value, False, j)
+                if entry.is_tombstone is True:
+                    if tombstone < 0:
+                        tombstone, tombstone_probes = hash_value, j
+                elif entry.hash == hash and entry.key == key:
+                    return hash_value, True, j
+
+                # Triangular probing, the offsets 1, 3, 6, 10, ... reach every bucket of a power of two table
+                hash_value = (hash_value + j) & mask
+                j += 1
+
+        hash_value = hash % capacity
         initial_hash = hash_value
         j = 1
 
-        # Keep looking until an empty bucket is found
-        while self._buckets[hash_value] is not None:
-
-            # Check if the key is valid and the one looking for
-            if self._buckets[hash_value].is_tombstone is False and self._buckets[hash_value].key == key:
-                return self._buckets[hash_value]
+        # Keep looking until an empty bucket is found. The offsets j * j only reach about half of the buckets and
+        # repeat every capacity steps, so a walk that has not met an empty bucket by then never will.
+        while j <= capacity:
+            entry = buckets[hash_value]
+            if entry is None:
+                return (tombstone, False, tombstone_probes) if tombstone >= 0 else (hash_value, False, j)
+
+            # Remember the first tombstone, otherwise check if the key is the one looking for, comparing the cached
+            # hashes first
+            if entry.is_tombstone is True:
+                if tombstone < 0:
+                    tombstone, tombstone_probes = hash_value, j
+            elif entry.hash == hash and entry.key == key:
+                return hash_value, True, j
 
             # Move to the next hash value
-            hash_value = (initial_hash + (j * j)) % self._capacity
+            hash_value = (initial_hash + (j * j)) % capacity
             j += 1
 
-        return None
+        # put() grows the table before it holds half of its buckets, which leaves an empty bucket in reach of every
+        # insert, so only a lookup of a missing key gets here
+        return tombstone, False, tombstone_probes
 
-    def _find_empty(self, key):
+    def _find_empty(self, hash):
         """
-        Returns the index of the first empty bucket that the specified key can be placed in. This will not check if the
-        key is already in the map, and will return the first valid index regardless of whether the key exists.
+        Returns the index of the first empty bucket that a key with the specified full hash can be placed in, and
+        the number of buckets probed to find it. This will not check if the key is already in the map, and will
+        return the first valid index regardless of whether the key exists. Used to move entries whose keys are
+        known to be unique, put() goes through _find_slot().
         """
 
-        # Get the hash
-        hash_value = self._hash_function(key) % self._capacity
+        if self._power_of_two:
+            mask = self._capacity - 1
+            hash_value = hash & mask
+            j = 1
+            while self._buckets[hash_value] is not None and self._buckets[hash_value].is_tombstone is False:
+                hash_value = (hash_value + j) & mask
+                j += 1
+            return hash_value, j
+
+        # Reduce the hash
+        hash_value = hash % self._capacity
         initial_hash = hash_value
         j = 1
 
@@ -143,7 +482,15 @@ class HashMap:
             hash_value = (initial_hash + (j * j)) % self._capacity
             j += 1
 
-        return hash_value
+        return hash_value, j
+
+    def _hash_keys(self, keys: list) -> list:
+        """
+        Returns the full hashes of a batch of keys as a list of ints, vectorized by hash_many() where possible
+        """
+        hashes = hash_many(keys, self._hash_function)
+        hashes = hashes if isinstance(hashes, list) else hashes.tolist()
+        return [mix64(hash) for hash in hashes] if self._power_of_two else hashes
 
     def table_load(self) -> float:
         """
@@ -153,9 +500,9 @@ class HashMap:
 
     def empty_buckets(self) -> int:
         """
-        Returns the number of empty buckets in the hash map
+        Returns the number of empty buckets in the hash map. Tombstones are not empty, they still lengthen probes.
         """
-        return self._capacity - self._size
+        return self._capacity - (self._size - self._old_size) - self._tombstones
 
     def resize_table(self, new_capacity: int) -> None:
         """
@@ -166,26 +513,67 @@ class HashMap:
         if new_capacity < self._size:
             return
 
-        # Find the closest prime
-        if self._is_prime(new_capacity) is False:
+        # Find the closest prime (or power of two)
+        if self._power_of_two:
+            new_capacity = self._fit_capacity(new_capacity)
+        elif self._is_prime(new_capacity) is False:
             new_capacity = self._next_prime(new_capacity)
 
-        # Get an array of the contents of the hash table
-        contents = self.get_keys_and_values()
-
-        # Adjust the capacity and then clear to build a new DA with the necessary capacity
+        # Reinserting through put() used to keep growing while the load stayed at or above max_load, so size the
+        # table for the final load up front instead of resizing again part way through
+        while self._size > 0 and (self._size - 1) / new_capacity >= self._max_load:
+            new_capacity = self._grown(new_capacity)
+
+        self._rehash(new_capacity)
+
+    def _rehash(self, new_capacity: int) -> None:
+        """
+        Moves every live entry into a new bucket array of the given (prime) capacity in a single pass. The keys are
+        already known to be unique, so there is no duplicate check, no load check and no tombstone handling, each
+        entry only walks the probe sequence of its cached hash until it hits an empty bucket. A migration in progress
+        is folded in by taking the entries left in the old array as well.
+        """
+        slots = [None] * new_capacity
+
+        sources = [(self._buckets, self._capacity)]
+        if self._old_buckets is not None:
+            sources.append((self._old_buckets, self._old_capacity))
+
+        for buckets, capacity in sources:
+            for i in range(capacity):
+                entry = buckets[i]
+                if entry is None or entry.is_tombstone is True:
+                    continue
+
+                if self._power_of_two:
+                    hash_value = entry.hash & (new_capacity - 1)
+                    j = 1
+                    while slots[hash_value] is not None:
+                        hash_value = (hash_value + j) & (new_capacity - 1)
+                        j += 1
+                else:
+                    hash_value = entry.hash % new_capacity
+                    initial_hash = hash_value
+                    j = 1
+                    while slots[hash_value] is not None:
+                        hash_value = (initial_hash + (j * j)) % new_capacity
+                        j += 1
+                slots[hash_value] = entry
+
+        self._buckets = DynamicArray(slots)
         self._capacity = new_capacity
-        self.clear()
-
-        # put the contents back into the hash table
-        for i in range(contents.length()):
-            key, value = contents[i]
-            self.put(key, value)
+        self._tombstones = 0
+        self._old_buckets = None
+        self._old_size = 0
+        self._version += 1
 
     def get(self, key: str) -> object:
         """
         Returns the value associated with the specified key. If the key is not in the hash, returns None
         """
+        if self._old_buckets is not None:
+            self._migrate(self._migrate_step)
+
         # Get the hash entry if it exists
         hash_entry = self._find_key(key)
 
@@ -194,10 +582,26 @@ class HashMap:
 
         return hash_entry.value
 
+    def get_many(self, keys) -> DynamicArray:
+        """
+        Returns a dynamic array with the value of each key of an iterable or DynamicArray, None for missing keys
+        """
+        keys = to_list(keys)
+        hashes = self._hash_keys(keys)
+
+        result_array = DynamicArray()
+        for i in range(len(keys)):
+            hash_entry = self._find_key(keys[i], hashes[i])
+            result_array.append(None if hash_entry is None else hash_entry.value)
+
+        return result_array
+
     def contains_key(self, key: str) -> bool:
         """
         Returns True if the specified key is in the hash map. Returns False otherwise
         """
+        if self._old_buckets is not None:
+            self._migrate(self._migrate_step)
 
         hash_entry = self._find_key(key)
 
@@ -210,11 +614,41 @@ class HashMap:
         """
         Removes the specified key from the hash map
         """
-        hash_entry = self._find_key(key)
+        if self._old_buckets is not None:
+            self._migrate(self._migrate_step)
+
+        self._remove_hashed(key, self._hash(key))
+        self._shrink_if_sparse()
+
+    def _remove_hashed(self, key: str, hash: int) -> None:
+        """
+        Removes the specified key, given its full hash, from the hash map
+        """
+        hash_entry = self._probe(self._buckets, self._capacity, key, hash)
 
         if hash_entry is not None:
             hash_entry.is_tombstone = True
             self._size -= 1
+            self._version += 1
+            self._tombstones += 1
+        elif self._old_buckets is not None:
+            # Tombstones in the old array are not counted, the array is dropped once the migration ends
+            hash_entry = self._probe(self._old_buckets, self._old_capacity, key, hash)
+            if hash_entry is not None:
+                hash_entry.is_tombstone = True
+                self._size -= 1
+                self._version += 1
+                self._old_size -= 1
+
+    def remove_many(self, keys) -> None:
+        """
+        Removes every key of an iterable or DynamicArray from the hash map, hashing the keys together
+        """
+        keys = to_list(keys)
+        hashes = self._hash_keys(keys)
+        for i in range(len(keys)):
+            self._remove_hashed(keys[i], hashes[i])
+        self._shrink_if_sparse()
 
     def clear(self) -> None:
         """
@@ -226,6 +660,36 @@ class HashMap:
             self._buckets.append(None)
 
         self._size = 0
+        self._tombstones = 0
+        self._old_buckets = None
+        self._old_size = 0
+        self._version += 1
+
+    def get_stats(self) -> dict:
+        """
+        Returns a snapshot of the map's statistics. All of them are maintained incrementally, so this is cheap
+        enough to poll.
+        """
+        return {
+            'size': self._size,
+            'capacity': self._capacity,
+            'table_load': self._size / self._capacity,
+            'empty_buckets': self._capacity - (self._size - self._old_size) - self._tombstones,
+            'occupied_buckets': self._size - self._old_size + self._tombstones,
+            'tombstones': self._tombstones,
+            'migrating_buckets': 0 if self._old_buckets is None else self._old_capacity - self._migrate_index,
+            'reseeds': self._reseeds,
+            'flood_limit': self._flood_limit,
+            'resizes_avoided': self._resizes_avoided,
+        }
+
+    def get_version(self) -> int:
+        """
+        Returns the modification count of the map. It changes whenever a key is added or removed or the table is
+        rebuilt, but not when the value of an existing key is updated. Anything derived from the keys at one version
+        is still valid while get_version() returns the same number.
+        """
+        return self._version
 
     def get_keys_and_values(self) -> DynamicArray:
         """
@@ -233,35 +697,59 @@ class HashMap:
         """
         result_array = DynamicArray()
 
-        # Iterate over the buckets
-        for i in range(self._capacity):
-            # Append any values that are not None or Tombstone
-            if self._buckets[i] is not None and self._buckets[i].is_tombstone is False:
-                result_array.append((self._buckets[i].key, self._buckets[i].value))
+        sources = [(self._buckets, self._capacity)]
+        if self._old_buckets is not None:
+            sources.append((self._old_buckets, self._old_capacity))
+
+        # Iterate over the buckets, including the ones of a migration in progress
+        for buckets, capacity in sources:
+            for i in range(capacity):
+                # Append any values that are not None or Tombstone
+                if buckets[i] is not None and buckets[i].is_tombstone is False:
+                    result_array.append((buckets[i].key, buckets[i].value))
 
         return result_array
 
-    def __iter__(self):
+    def keys(self):
+        """
+        Returns a generator over the keys of the hash map. Like values() and items() it reads the bucket array in
+        place, so it takes no memory beyond the generator itself, and any number of them can be iterated at once.
+        """
+        return (entry.key for entry in self._entries())
+
+    def values(self):
         """
-        Create iterator for loop
+        Returns a generator over the values of the hash map, see keys()
         """
-        self._index = 0
+        return (entry.value for entry in self._entries())
 
-        return self
+    def items(self):
+        """
+        Returns a generator over the (key, value) pairs of the hash map, see keys()
+        """
+        return ((entry.key, entry.value) for entry in self._entries())
+
+    def __iter__(self):
+        """
+        Create iterator for loop. Every call returns a new generator over the live HashEntry objects, so nested
+        loops over the same map do not interfere.
+        """
+        return self._entries()
 
-    def __next__(self):
+    def _entries(self):
         """
-        Get the next value for the iterator
+        Generator over the live entries of the bucket array. The iterator walks a single bucket array, so any
+        migration is finished first. Raises RuntimeError if the map is structurally modified while it is suspended.
         """
-        try:
-            while self._buckets[self._index] is None or self._buckets[self._index].is_tombstone is True:
-                self._index += 1
-        except DynamicArrayException:
-            raise StopIteration
+        if self._old_buckets is not None:
+            self._migrate(self._old_capacity)
 
-        value = self._buckets[self._index]
-        self._index += 1
-        return value
+        version = self._version
+        for entry in self._buckets:
+            if entry is not None and entry.is_tombstone is False:
+                yield entry
+                if self._version != version:
+                    raise RuntimeError("HashMap changed during iteration")
 
 
 # ------------------- BASIC TESTING ---------------------------------------- #
@@ -472,3 +960,17 @@ if __name__ == "__main__":
     print(m)
     for item in m:
         print('K:', item.key, 'V:', item.value)
+
+    print("\nShrink, then refill a small table")
+    print("---------------------------------")
+    # The removals shrink this table back to capacity 7, and refilling it puts 4 keys in it. They fill every bucket
+    # the probe sequence of 'str27' visits, so looking that key up used to walk that sequence forever.
+    m = HashMap(7, hash_function_1, min_load=0.1)
+    for i in range(20):
+        m.put('str' + str(i), i)
+    for i in range(18):
+        m.remove('str' + str(i))
+    print(m.get_size(), m.get_capacity())
+    m.put('str20', 20)
+    m.put('str21', 21)
+    print(m.get_size(), m.get_capacity(), m.get('str27'), m.get('str21'))
@@ -0,0 +1,277 @@
+# Course: CS261 - Data Structures
+# Assignment: 6
+# Description: Open addressing hash map with a compact, array-backed layout. Instead of a HashEntry object per
+#              bucket the table is kept in parallel arrays of hashes, keys and values, with the empty/live/tombstone
+#              state of every bucket in a byte array. Same public API as hash_map_oa.HashMap.
+
+from array import array
+
+from a6_include import DynamicArray, HashEntry, hash_function_1, hash_function_2, to_list
+from hash_map_oa import HashMap
+
+# Bucket states
+EMPTY = 0
+LIVE = 1
+TOMBSTONE = 2
+
+# Hashes are stored as unsigned 64 bit integers
+HASH_MASK = (1 << 64) - 1
+
+
+class CompactHashMap(HashMap):
+    def __init__(self, capacity: int, function, compact_ratio: float = 0.5, seed: int = None, max_load: float = 0.5,
+                 min_load: float = None, growth_factor: float = 2, expected_size: int = None) -> None:
+        """
+        Initialize new compact HashMap that uses
+        quadratic probing for collision resolution
+
+        function is a hash function, or the name of one registered in a6_include.HASH_FUNCTIONS.
+        compact_ratio is the share of the occupied buckets that must be tombstones for a full table to be compacted
+        in place at the same capacity instead of doubled. None disables compaction.
+        seed seeds the seeded hash functions, a random one is drawn by default. Hash flooding detection is not
+        supported by the compact layout.
+        max_load, min_load, growth_factor and expected_size work as for hash_map_oa.HashMap.
+        """
+        # Power of two mode, incremental resizing and hash flooding detection are not supported by the compact layout
+        super().__init__(capacity, function, compact_ratio=compact_ratio, seed=seed, flood_limit=None,
+                         max_load=max_load, min_load=min_load, growth_factor=growth_factor,
+                         expected_size=expected_size)
+
+        # The entries live in the parallel arrays instead of the HashEntry bucket array
+        self._buckets = None
+        self._allocate(self._capacity)
+
+    def __str__(self) -> str:
+        """
+        Override string method to provide more readable output
+        """
+        out = ''
+        for i in range(self._capacity):
+            if self._states[i] == EMPTY:
+                out += str(i) + ': None\n'
+            else:
+                out += f"{i}: K: {self._keys[i]} V: {self._values[i]} TS: {self._states[i] == TOMBSTONE}\n"
+        return out
+
+    def _allocate(self, capacity: int) -> None:
+        """
+        Sets up empty parallel arrays for a table of the given capacity
+        """
+        self._hashes = array('Q', bytes(8 * capacity))
+        self._keys = [None] * capacity
+        self._values = [None] * capacity
+        self._states = bytearray(capacity)
+
+    # ------------------------------------------------------------------ #
+
+    def _put_hashed(self, key: str, value: object, hash: int) -> None:
+        """
+        Puts the key value pair given the full hash of the key. Does not check the load, the caller must make room.
+        """
+        hash &= HASH_MASK
+
+        # One walk of the probe sequence finds either the key or the bucket a new entry goes in
+        index, found = self._find_compact_slot(key, hash)
+        if found:
+            # Update the value and return
+            self._values[index] = value
+            return
+
+        # Fill in the bucket
+        if self._states[index] == TOMBSTONE:
+            # Reusing a tombstone
+            self._tombstones -= 1
+        self._states[index] = LIVE
+        self._hashes[index] = hash
+        self._keys[index] = key
+        self._values[index] = value
+        self._size += 1
+        self._version += 1
+
+    def _find_index(self, key, hash) -> int:
+        """
+        Returns the bucket index of the specified key, given its masked full hash. Returns -1 if it does not exist
+        """
+        index, found = self._find_compact_slot(key, hash)
+        return index if found else -1
+
+    def _find_compact_slot(self, key, hash) -> tuple:
+        """
+        Walks the probe sequence of the masked full hash once and returns (index, found). If found is True, index is
+        the bucket of key. Otherwise it is the bucket a new entry for key belongs in: the first tombstone passed, or
+        else the empty bucket that ended the walk.
+        """
+        states, capacity = self._states, self._capacity
+        hash_value = hash % capacity
+        initial_hash = hash_value
+        tombstone = -1
+        j = 1
+
+        # Keep looking until an empty bucket is found, comparing the stored hashes before the keys. The walk gives up
+        # after capacity steps, see hash_map_oa.HashMap._find_slot().
+        while j <= capacity and states[hash_value] != EMPTY:
+            if states[hash_value] == TOMBSTONE:
+                if tombstone < 0:
+                    tombstone = hash_value
+            elif self._hashes[hash_value] == hash and self._keys[hash_value] == key:
+                return hash_value, True
+
+            # Move to the next hash value
+            hash_value = (initial_hash + (j * j)) % capacity
+            j += 1
+
+        if j > capacity:
+            return tombstone, False
+        return (tombstone if tombstone >= 0 else hash_value), False
+
+    def _rehash(self, new_capacity: int) -> None:
+        """
+        Moves every live bucket into new arrays of the given (prime) capacity in a single pass
+        """
+        hashes, keys, values, states = self._hashes, self._keys, self._values, self._states
+        self._allocate(new_capacity)
+
+        for i in range(self._capacity):
+            if states[i] != LIVE:
+                continue
+
+            hash_value = hashes[i] % new_capacity
+            initial_hash = hash_value
+            j = 1
+            while self._states[hash_value] != EMPTY:
+                hash_value = (initial_hash + (j * j)) % new_capacity
+                j += 1
+
+            self._states[hash_value] = LIVE
+            self._hashes[hash_value] = hashes[i]
+            self._keys[hash_value] = keys[i]
+            self._values[hash_value] = values[i]
+
+        self._capacity = new_capacity
+        self._tombstones = 0
+        self._version += 1
+
+    def get(self, key: str) -> object:
+        """
+        Returns the value associated with the specified key. If the key is not in the hash, returns None
+        """
+        index = self._find_index(key, self._hash_function(key) & HASH_MASK)
+        return None if index < 0 else self._values[index]
+
+    def get_many(self, keys) -> DynamicArray:
+        """
+        Returns a dynamic array with the value of each key of an iterable or DynamicArray, None for missing keys
+        """
+        keys = to_list(keys)
+        hashes = self._hash_keys(keys)
+
+        result_array = DynamicArray()
+        for i in range(len(keys)):
+            index = self._find_index(keys[i], hashes[i] & HASH_MASK)
+            result_array.append(None if index < 0 else self._values[index])
+
+        return result_array
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Returns True if the specified key is in the hash map. Returns False otherwise
+        """
+        return self._find_index(key, self._hash_function(key) & HASH_MASK) >= 0
+
+    def _remove_hashed(self, key: str, hash: int) -> None:
+        """
+        Removes the specified key, given its full hash, from the hash map. The key and value references are dropped
+        straight away, only the tombstone state is kept.
+        """
+        index = self._find_index(key, hash & HASH_MASK)
+
+        if index >= 0:
+            self._states[index] = TOMBSTONE
+            self._keys[index] = None
+            self._values[index] = None
+            self._size -= 1
+            self._version += 1
+            self._tombstones += 1
+
+    def clear(self) -> None:
+        """
+        Clears the contents of the hash map. Does not change the hash table capacity
+        """
+        self._allocate(self._capacity)
+        self._size = 0
+        self._tombstones = 0
+        self._version += 1
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """
+        Returns a dynamic array containing all key/value pairs stored in the hash map
+        """
+        result_array = DynamicArray()
+        for i in range(self._capacity):
+            if self._states[i] == LIVE:
+                result_array.append((self._keys[i], self._values[i]))
+
+        return result_array
+
+    def keys(self):
+        """
+        Returns a generator over the keys of the hash map, read straight from the parallel arrays
+        """
+        return (self._keys[i] for i in self._live_indices())
+
+    def values(self):
+        """
+        Returns a generator over the values of the hash map, read straight from the parallel arrays
+        """
+        return (self._values[i] for i in self._live_indices())
+
+    def items(self):
+        """
+        Returns a generator over the (key, value) pairs of the hash map, read straight from the parallel arrays
+        """
+        return ((self._keys[i], self._values[i]) for i in self._live_indices())
+
+    def _entries(self):
+        """
+        Generator over the live entries for __iter__(). Entries are not stored as objects, so a HashEntry is built
+        for each one.
+        """
+        return (HashEntry(self._keys[i], self._values[i], self._hashes[i]) for i in self._live_indices())
+
+    def _live_indices(self):
+        """
+        Generator over the indices of the live buckets. Raises RuntimeError if the map is structurally modified while
+        it is suspended.
+        """
+        version = self._version
+        states = self._states
+        for i in range(len(states)):
+            if states[i] == LIVE:
+                yield i
+                if self._version != version:
+                    raise RuntimeError("HashMap changed during iteration")
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    print("\nCompact - put, get, remove")
+    print("--------------------------")
+    m = CompactHashMap(53, hash_function_1)
+    for i in range(150):
+        m.put('str' + str(i), i * 100)
+    for i in range(0, 150, 2):
+        m.remove('str' + str(i))
+    print(m.get_size(), m.get_capacity(), m.empty_buckets(), m.get('str1'), m.get('str2'), m.contains_key('str3'))
+
+    print("\nCompact - __iter__(), __next__()")
+    print("--------------------------------")
+    m = CompactHashMap(10, hash_function_2)
+    for i in range(5):
+        m.put(str(i), str(i * 24))
+    m.remove('0')
+    m.remove('4')
+    print(m)
+    for item in m:
+        print('K:', item.key, 'V:', item.value)
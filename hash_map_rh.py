@@ -0,0 +1,227 @@
+# Course: CS261 - Data Structures
+# Assignment: 6
+# Description: Open addressing hash map with Robin Hood hashing. Linear probing where an entry that is further from
+#              its home bucket takes the bucket of one that is closer to its own, which keeps probe lengths short and
+#              even at high loads. Every bucket's probe distance is kept, so unsuccessful lookups stop early, and
+#              removal shifts the following entries back instead of leaving tombstones.
+#              Same public API as hash_map_oa.HashMap.
+
+from array import array
+
+from a6_include import DynamicArray, hash_function_1, hash_function_2
+from hash_map_oa import HashMap
+
+
+class RobinHoodHashMap(HashMap):
+    # Linear probing reaches every bucket whatever the capacity
+    _prime_load_limit = 1
+
+    # max_load that the flood_limit argument is meant for, see hash_map_oa.HashMap._scaled_flood_limit()
+    _flood_limit_load = 0.85
+
+    def __init__(self, capacity: int, function, max_load: float = 0.85, slots: bool = False,
+                 power_of_two: bool = False, seed: int = None, flood_limit: int = 128, stats_hook=None,
+                 min_load: float = None, growth_factor: float = 2, expected_size: int = None) -> None:
+        """
+        Initialize new HashMap that uses
+        Robin Hood linear probing for collision resolution
+
+        max_load is the load factor at which put() grows the table before adding a key, it must be between 0 and 1.
+        There are no tombstones, so unlike the quadratic probing map the load counts live entries only.
+        flood_limit defaults higher than for hash_map_oa.HashMap since linear probing at a high load has longer, if
+        evenly spread, probe sequences. It is the limit at a max_load of 0.85 and scales with the average probe
+        distance above that.
+        slots, power_of_two, seed, flood_limit, stats_hook, min_load, growth_factor and expected_size work as for
+        hash_map_oa.HashMap. Incremental resizing is not supported.
+        """
+        super().__init__(capacity, function, compact_ratio=None, slots=slots, power_of_two=power_of_two, seed=seed,
+                         flood_limit=flood_limit, stats_hook=stats_hook, max_load=max_load, min_load=min_load,
+                         growth_factor=growth_factor, expected_size=expected_size)
+
+        # Probe distance of the entry in every bucket from its home bucket, -1 for empty buckets. A 32 bit array
+        # rather than a list keeps the bookkeeping at half the size of the bucket array.
+        self._distances = array('i', [-1]) * self._capacity
+
+    def _expected_probes(self, load: float) -> float:
+        """
+        Returns the average number of buckets between a key and its home bucket at the given load. Robin Hood keeps
+        every distance close to that of a successful linear probing search, (1 + 1 / (1 - load)) / 2.
+        """
+        return (1 + 1 / (1 - load)) / 2
+
+    def _home(self, hash: int, capacity: int) -> int:
+        """
+        Returns the home bucket of a full hash in a table of the given capacity
+        """
+        if self._power_of_two:
+            return hash & (capacity - 1)
+        return hash % capacity
+
+    # ------------------------------------------------------------------ #
+
+    def put(self, key: str, value: object) -> None:
+        """
+        Puts the key value pair in the hash map. If the key already exists, the value is updated.
+        """
+        self._put_hashed(key, value, self._hash(key))
+
+    def _put_hashed(self, key: str, value: object, hash: int) -> None:
+        """
+        Puts the key value pair given the full hash of the key in a single probe pass. The table only grows if the
+        key is new and the load has reached max_load, updating a value never resizes.
+        """
+        index = self._home(hash, self._capacity)
+        distance = 0
+
+        # The key can only be in the buckets whose entries are at least as far from home as the probe is
+        while distance <= self._distances[index]:
+            entry = self._buckets[index]
+            if entry.hash == hash and entry.key == key:
+                entry.value = value
+                return
+
+            index += 1
+            if index == self._capacity:
+                index = 0
+            distance += 1
+
+        # The key is new. Like hash_map_oa.HashMap.put(), grow if the load has reached max_load, which presizing and
+        # resize_table() count on. Growing moves every entry, so the bucket the key belongs in has to be found again.
+        if self._size / self._capacity >= self._max_load:
+            self.resize_table(self._grown(self._capacity))
+            self._put_hashed(key, value, hash)
+            return
+
+        # index is the bucket the new key belongs in
+        self._place(self._entry_class(key, value, hash), index, distance)
+        self._size += 1
+        self._version += 1
+
+        if self._flood_limit is not None and distance + 1 > self._flood_limit:
+            self._reseed()
+
+    def _place(self, entry, index: int, distance: int) -> None:
+        """
+        Stores entry, which is distance buckets away from home, at index. Whenever the entry in a bucket is closer
+        to its home than the one being placed, the two swap and the displaced entry moves on down the table.
+        """
+        buckets, distances, capacity = self._buckets, self._distances, self._capacity
+
+        while distances[index] >= 0:
+            if distances[index] < distance:
+                buckets[index], entry = entry, buckets[index]
+                distances[index], distance = distance, distances[index]
+
+            index += 1
+            if index == capacity:
+                index = 0
+            distance += 1
+
+        buckets[index] = entry
+        distances[index] = distance
+
+    def _find_index(self, key: str, hash: int) -> int:
+        """
+        Returns the bucket index of the specified key, given its full hash. Returns -1 if it does not exist. The
+        search stops at the first bucket whose entry is closer to its home than the probe is to the key's home.
+        """
+        index = self._home(hash, self._capacity)
+        distance = 0
+
+        while distance <= self._distances[index]:
+            entry = self._buckets[index]
+            if entry.hash == hash and entry.key == key:
+                return index
+
+            index += 1
+            if index == self._capacity:
+                index = 0
+            distance += 1
+
+        return -1
+
+    def _find_key(self, key, hash=None):
+        """
+        Returns the HashEntry of the specified key. If the entry does not exist, returns None
+        """
+        if hash is None:
+            hash = self._hash(key)
+
+        index = self._find_index(key, hash)
+        return None if index < 0 else self._buckets[index]
+
+    def _rehash(self, new_capacity: int) -> None:
+        """
+        Places every entry into new bucket arrays of the given capacity in a single pass, from its cached hash
+        """
+        buckets = self._buckets
+        self._buckets = DynamicArray([None] * new_capacity)
+        self._distances = array('i', [-1]) * new_capacity
+        self._capacity, old_capacity = new_capacity, self._capacity
+        self._version += 1
+
+        for i in range(old_capacity):
+            if buckets[i] is not None:
+                self._place(buckets[i], self._home(buckets[i].hash, new_capacity), 0)
+
+    def _remove_hashed(self, key: str, hash: int) -> None:
+        """
+        Removes the specified key, given its full hash, from the hash map. The entries after it that are not in
+        their home bucket shift back by one, so no tombstone is needed.
+        """
+        index = self._find_index(key, hash)
+        if index < 0:
+            return
+
+        buckets, distances, capacity = self._buckets, self._distances, self._capacity
+        following = index + 1 if index + 1 < capacity else 0
+        while distances[following] > 0:
+            buckets[index] = buckets[following]
+            distances[index] = distances[following] - 1
+            index = following
+            following = index + 1 if index + 1 < capacity else 0
+
+        buckets[index] = None
+        distances[index] = -1
+        self._size -= 1
+        self._version += 1
+
+    def clear(self) -> None:
+        """
+        Clears the contents of the hash map. Does not change the hash table capacity
+        """
+        super().clear()
+        self._distances = array('i', [-1]) * self._capacity
+
+    def get_stats(self) -> dict:
+        """
+        Returns a snapshot of the map's statistics, see hash_map_oa.HashMap.get_stats(). tombstones is always 0.
+        """
+        stats = super().get_stats()
+        stats['max_load'] = self._max_load
+        return stats
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    print("\nRobin Hood - put, get, remove")
+    print("-----------------------------")
+    m = RobinHoodHashMap(53, hash_function_1)
+    for i in range(150):
+        m.put('str' + str(i), i * 100)
+    for i in range(0, 150, 2):
+        m.remove('str' + str(i))
+    print(m.get_size(), m.get_capacity(), m.empty_buckets(), m.get('str1'), m.get('str2'), m.contains_key('str3'))
+
+    print("\nRobin Hood - __iter__(), __next__()")
+    print("-----------------------------------")
+    m = RobinHoodHashMap(10, hash_function_2)
+    for i in range(5):
+        m.put(str(i), str(i * 24))
+    m.remove('0')
+    m.remove('4')
+    print(m)
+    for item in m:
+        print('K:', item.key, 'V:', item.value)
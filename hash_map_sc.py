@@ -5,72 +5,176 @@
 # Due Date: 2023/08/15
 # Description: Hash map implementation that uses separate chaining for collision resolution
 
+from math import ceil
 
-from a6_include import (DynamicArray, LinkedList,
-                        hash_function_1, hash_function_2)
+from a6_include import (DynamicArray, LinkedList, SlottedLinkedList, SlottedTreeBucket, TreeBucket,
+                        SEEDED_HASH_FUNCTIONS, get_hash_function, hash_function_1, hash_function_2,
+                        hash_many, mix64, random_seed, seeded_hash_function, to_list)
+from prime_capacity import is_prime, next_prime
 
 
 class HashMap:
+    # max_load that the flood_limit argument is meant for, see _scaled_flood_limit()
+    _flood_limit_load = 1
+
     def __init__(self,
                  capacity: int = 11,
-                 function: callable = hash_function_1) -> None:
+                 function: callable = hash_function_1,
+                 slots: bool = False,
+                 incremental: bool = False,
+                 migrate_step: int = 16,
+                 power_of_two: bool = False,
+                 seed: int = None,
+                 flood_limit: int = 16,
+                 stats_hook: callable = None,
+                 treeify_threshold: int = None,
+                 reorder: str = None,
+                 max_load: float = 1,
+                 min_load: float = None,
+                 growth_factor: float = 2,
+                 expected_size: int = None) -> None:
         """
         Initialize new HashMap that uses
         separate chaining for collision resolution
-        DO NOT CHANGE THIS METHOD IN ANY WAY
-        """
-        self._buckets = DynamicArray()
-
-        # capacity must be a prime number
-        self._capacity = self._next_prime(capacity)
-        for _ in range(self._capacity):
-            self._buckets.append(LinkedList())
 
-        self._hash_function = function
+        function is a hash function, or the name of one registered in a6_include.HASH_FUNCTIONS.
+        slots=True builds the chains from the __slots__ based SlottedLinkedList and SlottedSLNode, which need
+        noticeably less memory per bucket and per entry.
+        incremental=True replaces the stop-the-world rehash that put() triggers with a gradual one: the old and new
+        bucket arrays coexist and every put, get, contains_key and remove moves migrate_step old buckets over.
+        power_of_two=True uses power of two capacities instead of primes: hashes go through mix64() and buckets
+        are picked with a bit mask instead of a modulo.
+        seed seeds the seeded hash functions (a6_include.SEEDED_HASH_FUNCTIONS, e.g. 'siphash'), a random one is
+        drawn for every map by default. With a seeded function a put() that grows a chain past flood_limit nodes is
+        taken as hash flooding: the map draws a new seed and rehashes, then calls stats_hook('reseed', get_stats())
+        if a hook is given. Unseeded functions cannot be reseeded, so they are never checked. flood_limit is the limit
+        at a max_load of 1, a higher max_load raises it in step with the average chain length. None disables the
+        check.
+        treeify_threshold turns a chain that grows longer than that many nodes into a TreeBucket, sorted by
+        (hash, key) so that lookups in it are binary searches. It turns back into a LinkedList once it shrinks to
+        half the threshold. None, the default, keeps every bucket a LinkedList.
+        reorder makes the chains self-organizing: 'move_to_front' moves the node a get() finds to the front of its
+        chain, 'transpose' swaps it with the node in front of it. None, the default, never reorders.
+        max_load is the load factor at which put() grows the table, growth_factor the factor it grows by. min_load
+        makes remove() shrink the table once the load drops below it, to a capacity halfway between min_load and
+        max_load and no smaller than the initial capacity. It must be below max_load / growth_factor, so that a
+        table that just grew does not shrink straight back. None, the default, never shrinks.
+        expected_size starts the table at the capacity put() would have grown it to by the time it holds that many
+        keys, see reserve(). The table then never shrinks below that capacity either.
+        """
+        if max_load <= 0 or growth_factor <= 1:
+            raise ValueError("max_load must be positive and growth_factor larger than 1")
+        if min_load is not None and not 0 <= min_load < max_load / growth_factor:
+            raise ValueError("min_load must be at least 0 and below max_load / growth_factor")
+        self._max_load = max_load
+        self._min_load = min_load
+        self._growth_factor = growth_factor
+
+        if reorder not in (None, 'move_to_front', 'transpose'):
+            raise ValueError(f"Unknown reorder mode {reorder!r}, expected 'move_to_front' or 'transpose'")
+        self._reorder = reorder
+
+        self._list_class = SlottedLinkedList if slots else LinkedList
+        self._tree_class = SlottedTreeBucket if slots else TreeBucket
+        self._treeify_threshold = treeify_threshold
+        self._power_of_two = power_of_two
+
+        # capacity must be a prime number (or a power of two)
+        # Buckets start out as None and only get a LinkedList on their first insert
+        self._capacity = self._fit_capacity(capacity)
+        self._resizes_avoided = 0   # growths that reserve() and put_many() saved put() from doing one by one
+        if expected_size is not None:
+            self._capacity, self._resizes_avoided = self._reserved_capacity(self._capacity, expected_size)
+        self._min_capacity = self._capacity
+        self._buckets = DynamicArray([None] * self._capacity)
+
+        self._base_function = get_hash_function(function)
+        self._seed = random_seed() if seed is None else seed
+        self._hash_function = seeded_hash_function(self._base_function, self._seed)
         self._size = 0
+        self._version = 0           # bumped by every structural modification, see get_version()
+
+        # Hash flooding detection, only possible with a seeded hash function
+        self._flood_limit = self._scaled_flood_limit(flood_limit) if self._base_function in SEEDED_HASH_FUNCTIONS \
+            else None
+        self._stats_hook = stats_hook
+        self._reseeds = 0
+
+        # Statistics kept up to date by every operation, so reading them is O(1)
+        self._occupied = 0          # number of buckets holding at least one node
+        self._chain_lengths = {}    # chain length -> number of buckets with a chain that long
+        self._longest_chain = 0
+
+        # Incremental resizing, _old_buckets is None unless a migration is in progress. The statistics above only
+        # describe the new array.
+        self._incremental = incremental
+        self._migrate_step = migrate_step
+        self._old_buckets = None
+        self._old_capacity = 0
+        self._migrate_index = 0
 
     def __str__(self) -> str:
         """
         Override string method to provide more readable output
-        DO NOT CHANGE THIS METHOD IN ANY WAY
         """
         out = ''
         for i in range(self._buckets.length()):
-            out += str(i) + ': ' + str(self._buckets[i]) + '\n'
+            bucket = self._buckets[i]
+            out += str(i) + ': ' + ('SLL []' if bucket is None else str(bucket)) + '\n'
         return out
 
     def _next_prime(self, capacity: int) -> int:
         """
-        Increment from given number and the find the closest prime number
-        DO NOT CHANGE THIS METHOD IN ANY WAY
+        Find the closest prime number equal to or larger than the given number, see prime_capacity.next_prime()
         """
-        if capacity % 2 == 0:
-            capacity += 1
-
-        while not self._is_prime(capacity):
-            capacity += 2
-
-        return capacity
+        return next_prime(capacity)
 
     @staticmethod
     def _is_prime(capacity: int) -> bool:
         """
-        Determine if given integer is a prime number and return boolean
-        DO NOT CHANGE THIS METHOD IN ANY WAY
+        Determine if given integer is a prime number and return boolean, see prime_capacity.is_prime()
         """
-        if capacity == 2 or capacity == 3:
-            return True
+        return is_prime(capacity)
 
-        if capacity == 1 or capacity % 2 == 0:
-            return False
+    def _fit_capacity(self, capacity: int) -> int:
+        """
+        Returns the capacity to use for a table of at least the given size: the next prime number, or the next
+        power of two in power of two mode
+        """
+        if self._power_of_two:
+            return 1 << max(capacity - 1, 1).bit_length()
+        return self._next_prime(capacity)
+
+    def _hash(self, key: str) -> int:
+        """
+        Returns the full hash of key. In power of two mode it is mixed, since the mask only keeps its low bits.
+        """
+        hash = self._hash_function(key)
+        return mix64(hash) if self._power_of_two else hash
 
-        factor = 3
-        while factor ** 2 <= capacity:
-            if capacity % factor == 0:
-                return False
-            factor += 2
+    def _scaled_flood_limit(self, flood_limit: int):
+        """
+        Returns flood_limit raised for a max_load above _flood_limit_load, by the factor the chain a put() walks grows
+        by: 1 + load nodes on average. The longest chains of ordinary keys grow along with it, and a fixed limit would
+        have them reseed over and over, each time rehashing the table without making any chain shorter.
+        """
+        if flood_limit is None or self._max_load <= self._flood_limit_load:
+            return flood_limit
+        return ceil(flood_limit * (1 + self._max_load) / (1 + self._flood_limit_load))
 
-        return True
+    def _grown(self, capacity: int) -> int:
+        """
+        Returns the capacity a table of the given capacity grows to
+        """
+        return self._fit_capacity(max(capacity + 1, int(capacity * self._growth_factor)))
+
+    def _reduce(self, hash: int, capacity: int) -> int:
+        """
+        Returns the bucket index of a full hash in a table of the given capacity
+        """
+        if self._power_of_two:
+            return hash & (capacity - 1)
+        return hash % capacity
 
     def get_size(self) -> int:
         """
@@ -92,36 +196,267 @@ class HashMap:
         """
         Puts the key value pair in the hash map. If the key already exists, the value is updated.
         """
+        if self._old_buckets is not None:
+            self._migrate(self._migrate_step)
 
         # Check if resize is necessary
-        if self.table_load() >= 1:
-            self.resize_table(self._capacity * 2)
+        if self.table_load() >= self._max_load:
+            if self._old_buckets is not None:
+                # Still moving nodes out of the previous array, finish that before starting over
+                self._migrate(self._old_capacity)
+
+            if self._incremental:
+                self._start_migration(self._grown(self._capacity))
+            else:
+                self.resize_table(self._grown(self._capacity))
 
-        # Get the hash
-        hash_value = self._hash_function(key) % self._capacity
+        # Get the hash, the full hash is cached in the node so a resize never re-hashes the key
+        self._put_hashed(key, value, self._hash(key))
+
+    def _put_hashed(self, key: str, value: object, hash: int) -> None:
+        """
+        Puts the key value pair given the full hash of the key. Does not check the load, the caller must make room.
+        """
+        # While migrating, the key may still be in the old array
+        if self._old_buckets is not None:
+            old_bucket = self._old_buckets[self._reduce(hash, self._old_capacity)]
+            existing_node = None if old_bucket is None else old_bucket.contains(key, hash)
+            if existing_node is not None:
+                existing_node.value = value
+                return
+
+        hash_value = self._reduce(hash, self._capacity)
+        bucket = self._buckets[hash_value]
 
         # Put in the map
-        # Check for an existing node
-        existing_node = self._buckets[hash_value].contains(key)
+        if bucket is None:
+            # First key of this bucket, allocate its list
+            bucket = self._list_class()
+            self._buckets[hash_value] = bucket
+            self._occupied += 1
+            existing_node = None
+        else:
+            # Check for an existing node
+            existing_node = bucket.contains(key, hash)
+
         if existing_node is None:
             # Create a new node
-            self._buckets[hash_value].insert(key, value)
+            bucket.insert(key, value, hash)
             self._size += 1
+            self._version += 1
+            self._chain_resized(bucket.length() - 1, bucket.length())
+            self._fit_bucket(self._buckets, hash_value)
+
+            if self._flood_limit is not None and bucket.length() > self._flood_limit:
+                self._reseed()
         else:
             # Update the existing node's value
             existing_node.value = value
 
+    def _fit_bucket(self, buckets: DynamicArray, index: int) -> None:
+        """
+        Turns the bucket at index into a TreeBucket if it is longer than treeify_threshold, or back into a
+        LinkedList if it is a TreeBucket that shrank to half the threshold
+        """
+        bucket = buckets[index]
+        if self._treeify_threshold is None or bucket is None:
+            return
+
+        if type(bucket) is self._tree_class:
+            if bucket.length() <= self._treeify_threshold // 2:
+                chain = self._list_class()
+                for node in bucket:
+                    chain.insert_node(node)
+                buckets[index] = chain
+        elif bucket.length() > self._treeify_threshold:
+            buckets[index] = self._tree_class(bucket)
+
+    def _reseed(self) -> None:
+        """
+        Switches to a new random seed, recomputes the cached hash of every node and rehashes at the same capacity,
+        then reports the event to the stats hook
+        """
+        self._seed = random_seed()
+        self._hash_function = seeded_hash_function(self._base_function, self._seed)
+        self._reseeds += 1
+
+        sources = [self._buckets] if self._old_buckets is None else [self._buckets, self._old_buckets]
+        for buckets in sources:
+            for i in range(buckets.length()):
+                if buckets[i] is not None:
+                    for node in buckets[i]:
+                        node.hash = self._hash(node.key)
+        self._rehash(self._capacity)
+
+        if self._stats_hook is not None:
+            self._stats_hook('reseed', self.get_stats())
+
+    def _start_migration(self, new_capacity: int) -> None:
+        """
+        Swaps in an empty bucket array of the given (prime) capacity and keeps the current one around as the old
+        array, whose nodes are moved over a few buckets at a time by _migrate()
+        """
+        self._old_buckets = self._buckets
+        self._old_capacity = self._capacity
+        self._migrate_index = 0
+
+        self._buckets = DynamicArray([None] * new_capacity)
+        self._capacity = new_capacity
+        self._occupied = 0
+        self._chain_lengths = {}
+        self._longest_chain = 0
+        self._version += 1
+
+    def _migrate(self, count: int) -> None:
+        """
+        Moves the nodes of the next count buckets of the old array into the new one
+        """
+        end = min(self._migrate_index + count, self._old_capacity)
+        for i in range(self._migrate_index, end):
+            if self._old_buckets[i] is None:
+                continue
+
+            # The iterator steps past a node before handing it out, so relinking it here is safe
+            for node in self._old_buckets[i]:
+                hash_value = self._reduce(node.hash, self._capacity)
+                bucket = self._buckets[hash_value]
+                if bucket is None:
+                    bucket = self._list_class()
+                    self._buckets[hash_value] = bucket
+                    self._occupied += 1
+                bucket.insert_node(node)
+                self._chain_resized(bucket.length() - 1, bucket.length())
+                self._fit_bucket(self._buckets, hash_value)
+            self._old_buckets[i] = None
+
+        self._migrate_index = end
+        if end == self._old_capacity:
+            self._old_buckets = None
+
+    def _chain_resized(self, old_length: int, new_length: int) -> None:
+        """
+        Updates the chain length statistics after one chain grew or shrank by a node
+        """
+        if old_length > 0:
+            self._chain_lengths[old_length] -= 1
+            if self._chain_lengths[old_length] == 0:
+                del self._chain_lengths[old_length]
+        if new_length > 0:
+            self._chain_lengths[new_length] = self._chain_lengths.get(new_length, 0) + 1
+
+        if new_length > self._longest_chain:
+            self._longest_chain = new_length
+        elif old_length == self._longest_chain and old_length not in self._chain_lengths:
+            # The only chain of the longest length just shrank
+            self._longest_chain = new_length
+
+    def _find_node(self, key: str, hash: int, reorder: bool = False):
+        """
+        Returns the node of the specified key given its full hash, or None if the key is not in the map.
+        With reorder=True a found node is moved up its chain as the map's reorder mode says.
+        """
+        bucket = self._buckets[self._reduce(hash, self._capacity)]
+        if bucket is None:
+            node = None
+        elif reorder and self._reorder is not None and type(bucket) is self._list_class:
+            # The list methods are named after the reorder modes. Moving a node is a structural modification for the
+            # iterators, finding it already at the front is not.
+            node, moved = getattr(bucket, self._reorder)(key)
+            if moved:
+                self._version += 1
+        else:
+            node = bucket.contains(key, hash)
+
+        # While migrating, keys that were not moved yet are still in the old array
+        if node is None and self._old_buckets is not None:
+            bucket = self._old_buckets[self._reduce(hash, self._old_capacity)]
+            node = None if bucket is None else bucket.contains(key, hash)
+
+        return node
+
+    def put_many(self, pairs) -> None:
+        """
+        Puts every (key, value) pair of an iterable or DynamicArray in the hash map. The table is grown at most once,
+        up front, to fit the whole batch and the keys are hashed together.
+        """
+        pairs = to_list(pairs)
+        self._presize(len(pairs))
+
+        hashes = self._hash_keys([key for key, _ in pairs])
+        reseeds = self._reseeds
+        for i in range(len(pairs)):
+            if self._reseeds != reseeds:
+                # A reseed part way through the batch changed the hash function, hash the rest of the keys again
+                reseeds = self._reseeds
+                hashes[i:] = self._hash_keys([key for key, _ in pairs[i:]])
+            self._put_hashed(pairs[i][0], pairs[i][1], hashes[i])
+
+    def _presize(self, count: int) -> None:
+        """
+        Makes room for count more keys so that none of their puts crosses the load limit. Picks the capacity the
+        put() growths would have reached and rehashes once.
+        """
+        if count == 0 or (self._size + count - 1) / self._capacity < self._max_load:
+            return
+
+        capacity, growths = self._reserved_capacity(self._capacity, self._size + count)
+        self._rehash(capacity)
+        self._resizes_avoided += growths - 1
+
+    def _reserved_capacity(self, capacity: int, count: int) -> tuple:
+        """
+        Returns (capacity, growths): the capacity put() would have grown a table of the given capacity to by the time
+        it holds count keys, and the number of growths that took
+        """
+        growths = 0
+        while count > 0 and (count - 1) / capacity >= self._max_load:
+            capacity = self._grown(capacity)
+            growths += 1
+        return capacity, growths
+
+    def reserve(self, count: int) -> None:
+        """
+        Grows the table up front, in a single rehash, so that it can hold count keys in total without put()
+        resizing it. Does nothing if the table is already large enough.
+        """
+        if count > self._size:
+            self._presize(count - self._size)
+
+    def _shrink_if_sparse(self) -> None:
+        """
+        Shrinks the table after a removal if its load dropped below min_load. The new capacity puts the load halfway
+        between min_load and max_load, but is never below the initial capacity.
+        """
+        if self._min_load is None or self.table_load() >= self._min_load:
+            return
+
+        target = ceil(self._size / ((self._min_load + self._max_load) / 2))
+        capacity = self._fit_capacity(max(target, self._min_capacity))
+        if capacity >= self._capacity:
+            return
+
+        if self._old_buckets is not None:
+            # Still moving nodes out of the previous array, finish that before starting over
+            self._migrate(self._old_capacity)
+
+        if self._incremental:
+            self._start_migration(capacity)
+        else:
+            self._rehash(capacity)
+
+    def _hash_keys(self, keys: list) -> list:
+        """
+        Returns the full hashes of a batch of keys as a list of ints, vectorized by hash_many() where possible
+        """
+        hashes = hash_many(keys, self._hash_function)
+        hashes = hashes if isinstance(hashes, list) else hashes.tolist()
+        return [mix64(hash) for hash in hashes] if self._power_of_two else hashes
+
     def empty_buckets(self) -> int:
         """
         Returns the number of empty buckets in the hash map
         """
-        # Iterate over the buckets, counting any that return a length of 0
-        empty_buckets = 0
-        for i in range(self._capacity):
-            if self._buckets[i].length() == 0:
-                empty_buckets += 1
-
-        return empty_buckets
+        return self._capacity - self._occupied
 
     def table_load(self) -> float:
         """
@@ -134,11 +469,14 @@ class HashMap:
         Clears the contents of the hash map. Does not change the hash table capacity
         """
         # Direct copy of the section of init responsible for setting up the hash table, without modifying capacity
-        self._buckets = DynamicArray()
-        for _ in range(self._capacity):
-            self._buckets.append(LinkedList())
+        self._buckets = DynamicArray([None] * self._capacity)
 
         self._size = 0
+        self._occupied = 0
+        self._chain_lengths = {}
+        self._longest_chain = 0
+        self._old_buckets = None
+        self._version += 1
 
     def resize_table(self, new_capacity: int) -> None:
         """
@@ -150,29 +488,70 @@ class HashMap:
         if new_capacity < 1:
             return
 
-        # Find the closest prime
-        if self._is_prime(new_capacity) is False:
+        # Find the closest prime (or power of two)
+        if self._power_of_two:
+            new_capacity = self._fit_capacity(new_capacity)
+        elif self._is_prime(new_capacity) is False:
             new_capacity = self._next_prime(new_capacity)
 
-        # Get an array of the contents of the hash table
-        contents = self.get_keys_and_values()
+        # Reinserting through put() used to keep growing while the load stayed at or above max_load, so size the table
+        # for the final load up front instead of resizing again part way through
+        while self._size > 0 and (self._size - 1) / new_capacity >= self._max_load:
+            new_capacity = self._grown(new_capacity)
 
-        # Adjust the capacity and then clear to build a new DA with the necessary capacity
-        self._capacity = new_capacity
-        self.clear()
+        self._rehash(new_capacity)
 
-        # put the contents back into the hash table
-        for i in range(contents.length()):
-            key, value = contents[i]
-            self.put(key, value)
+    def _rehash(self, new_capacity: int) -> None:
+        """
+        Moves every node into a new bucket array of the given (prime) capacity in a single pass. The keys are already
+        known to be unique, so nodes are linked straight onto the front of their new chain without a contains() scan
+        or a load check. Only buckets that receive a node get a LinkedList. A migration in progress is folded in by
+        taking the nodes left in the old array as well.
+        """
+        chains = [None] * new_capacity
+
+        sources = [(self._buckets, self._capacity)]
+        if self._old_buckets is not None:
+            sources.append((self._old_buckets, self._old_capacity))
+
+        for buckets, capacity in sources:
+            for i in range(capacity):
+                if buckets[i] is None:
+                    continue
+
+                # The iterator steps past a node before handing it out, so relinking it here is safe
+                for node in buckets[i]:
+                    hash_value = self._reduce(node.hash, new_capacity)
+                    chain = chains[hash_value]
+                    if chain is None:
+                        chain = self._list_class()
+                        chains[hash_value] = chain
+                    chain.insert_node(node)
+
+        self._buckets = DynamicArray(chains)
+        self._capacity = new_capacity
+        self._old_buckets = None
+        self._version += 1
+
+        # Recount the chain statistics for the new layout
+        self._occupied = 0
+        self._chain_lengths = {}
+        self._longest_chain = 0
+        for i in range(new_capacity):
+            if chains[i] is not None:
+                self._occupied += 1
+                self._chain_resized(0, chains[i].length())
+                self._fit_bucket(self._buckets, i)
 
     def get(self, key: str):
         """
         Returns the value associated with the specified key. If the key is not in the hash, returns None
         """
+        if self._old_buckets is not None:
+            self._migrate(self._migrate_step)
+
         # Get the hash of the key and check if a node exists in the relevant list
-        hash_value = self._hash_function(key) % self._capacity
-        node = self._buckets[hash_value].contains(key)
+        node = self._find_node(key, self._hash(key), reorder=True)
 
         # If no node exists, return None
         if node is None:
@@ -181,13 +560,29 @@ class HashMap:
         # Else, return the value at that node
         return node.value
 
+    def get_many(self, keys) -> DynamicArray:
+        """
+        Returns a dynamic array with the value of each key of an iterable or DynamicArray, None for missing keys
+        """
+        keys = to_list(keys)
+        hashes = self._hash_keys(keys)
+
+        result_array = DynamicArray()
+        for i in range(len(keys)):
+            node = self._find_node(keys[i], hashes[i], reorder=True)
+            result_array.append(None if node is None else node.value)
+
+        return result_array
+
     def contains_key(self, key: str) -> bool:
         """
         Returns True if the specified key is in the hash map. Returns False otherwise
         """
+        if self._old_buckets is not None:
+            self._migrate(self._migrate_step)
+
         # Get the hash of the key and check if a node exists in the relevant list
-        hash_value = self._hash_function(key) % self._capacity
-        node = self._buckets[hash_value].contains(key)
+        node = self._find_node(key, self._hash(key))
 
         # If no node exists, return False
         if node is None:
@@ -200,14 +595,76 @@ class HashMap:
         """
         Removes the specified key from the hash map
         """
-        # Get the hash of the key
-        hash_value = self._hash_function(key) % self._capacity
+        if self._old_buckets is not None:
+            self._migrate(self._migrate_step)
+
+        self._remove_hashed(key, self._hash(key))
+        self._shrink_if_sparse()
 
-        # Remove the key from the relevant list
-        removed = self._buckets[hash_value].remove(key)
+    def _remove_hashed(self, key: str, hash: int) -> None:
+        """
+        Removes the specified key, given its full hash, from the hash map
+        """
+        hash_value = self._reduce(hash, self._capacity)
+        bucket = self._buckets[hash_value]
 
-        if removed is True:
+        # Remove the key from the relevant list, an emptied list goes back to None
+        if bucket is not None and bucket.remove(key, hash) is True:
             self._size -= 1
+            self._version += 1
+            self._chain_resized(bucket.length() + 1, bucket.length())
+            if bucket.length() == 0:
+                self._buckets[hash_value] = None
+                self._occupied -= 1
+            else:
+                self._fit_bucket(self._buckets, hash_value)
+
+        elif self._old_buckets is not None:
+            # The key may still be in the old array, which is not part of the statistics
+            hash_value = self._reduce(hash, self._old_capacity)
+            bucket = self._old_buckets[hash_value]
+            if bucket is not None and bucket.remove(key, hash) is True:
+                self._size -= 1
+                self._version += 1
+                if bucket.length() == 0:
+                    self._old_buckets[hash_value] = None
+
+    def remove_many(self, keys) -> None:
+        """
+        Removes every key of an iterable or DynamicArray from the hash map, hashing the keys together
+        """
+        keys = to_list(keys)
+        hashes = self._hash_keys(keys)
+        for i in range(len(keys)):
+            self._remove_hashed(keys[i], hashes[i])
+        self._shrink_if_sparse()
+
+    def get_stats(self) -> dict:
+        """
+        Returns a snapshot of the map's statistics. All of them are maintained incrementally, so this is cheap
+        enough to poll.
+        """
+        return {
+            'size': self._size,
+            'capacity': self._capacity,
+            'table_load': self._size / self._capacity,
+            'empty_buckets': self._capacity - self._occupied,
+            'occupied_buckets': self._occupied,
+            'longest_chain': self._longest_chain,
+            'chain_lengths': dict(self._chain_lengths),
+            'migrating_buckets': 0 if self._old_buckets is None else self._old_capacity - self._migrate_index,
+            'reseeds': self._reseeds,
+            'flood_limit': self._flood_limit,
+            'resizes_avoided': self._resizes_avoided,
+        }
+
+    def get_version(self) -> int:
+        """
+        Returns the modification count of the map. It changes whenever a key is added or removed, the table is
+        rebuilt or a reorder mode moves a node, but not when the value of an existing key is updated. Anything derived
+        from the keys at one version is still valid while get_version() returns the same number.
+        """
+        return self._version
 
     def get_keys_and_values(self) -> DynamicArray:
         """
@@ -215,14 +672,66 @@ class HashMap:
         """
         result_array = DynamicArray()
 
-        # Iterate over the buckets
-        for i in range(self._capacity):
-            # Iterate over the linked list in each bucket
-            for node in self._buckets[i]:
-                result_array.append((node.key, node.value))
+        sources = [(self._buckets, self._capacity)]
+        if self._old_buckets is not None:
+            sources.append((self._old_buckets, self._old_capacity))
+
+        # Iterate over the buckets, including the ones of a migration in progress
+        for buckets, capacity in sources:
+            for i in range(capacity):
+                if buckets[i] is None:
+                    continue
+
+                # Iterate over the linked list in each bucket
+                for node in buckets[i]:
+                    result_array.append((node.key, node.value))
 
         return result_array
 
+    def keys(self):
+        """
+        Returns a generator over the keys of the hash map. Like values() and items() it walks the chains in place,
+        so it takes no memory beyond the generator itself, and any number of them can be iterated at once.
+        """
+        return (node.key for node in self._nodes())
+
+    def values(self):
+        """
+        Returns a generator over the values of the hash map, see keys()
+        """
+        return (node.value for node in self._nodes())
+
+    def items(self):
+        """
+        Returns a generator over the (key, value) pairs of the hash map, see keys()
+        """
+        return ((node.key, node.value) for node in self._nodes())
+
+    def __iter__(self):
+        """
+        Create iterator for loop. Every call returns a new generator over the nodes, which have key and value
+        attributes, so nested loops over the same map do not interfere.
+        """
+        return self._nodes()
+
+    def _nodes(self):
+        """
+        Generator over the nodes of every chain. The iterator walks a single bucket array, so any migration is
+        finished first. Raises RuntimeError if the map is structurally modified while it is suspended.
+        """
+        if self._old_buckets is not None:
+            self._migrate(self._old_capacity)
+
+        version = self._version
+        for bucket in self._buckets:
+            if bucket is None:
+                continue
+
+            for node in bucket:
+                yield node
+                if self._version != version:
+                    raise RuntimeError("HashMap changed during iteration")
+
 
 def find_mode(da: DynamicArray) -> tuple[DynamicArray, int]:
     """
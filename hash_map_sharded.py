@@ -0,0 +1,363 @@
+# Course: CS261 - Data Structures
+# Assignment: 6
+# Description: Hash map sharded over worker processes. Keys are partitioned by hash across N processes, each holding
+#              its own hash_map_sc.HashMap, so the shards run on as many cores instead of sharing one GIL. Requests
+#              travel over one pipe per shard. Puts and removes are buffered and sent in batches, and the *_many
+#              methods send every shard its part of the batch before waiting for any answer.
+
+import multiprocessing
+from itertools import groupby
+from operator import itemgetter
+
+from a6_include import (DynamicArray, get_hash_function, hash_function_1, hash_function_2, hash_many, mix64,
+                        mix64_many, random_seed, seeded_hash_function, to_list)
+from hash_map_sc import HashMap
+
+# Operations buffered for a shard
+PUT = 0
+REMOVE = 1
+
+
+def _serve(connection, capacity: int, function, seed: int, options: dict) -> None:
+    """
+    Runs in a shard's worker process. Keeps a hash_map_sc.HashMap and answers the requests coming in over
+    connection until it receives 'stop'. Buffered operations ('apply') get no answer, so an exception they raise is
+    held back and returned in place of the answer to the next request instead.
+    """
+    hash_map = HashMap(capacity, function, seed=seed, **options)
+    error = None
+
+    while True:
+        command, payload = connection.recv()
+
+        if command == 'apply':
+            try:
+                # Runs of puts and of removes go through the batch methods, which hash their keys together
+                for operation, run in groupby(payload, key=itemgetter(0)):
+                    if operation == PUT:
+                        hash_map.put_many([(key, value) for _, key, value in run])
+                    else:
+                        hash_map.remove_many([key for _, key, _ in run])
+            except Exception as exception:
+                error = error or exception
+            continue
+
+        if command == 'stop':
+            connection.close()
+            return
+
+        try:
+            if error is not None:
+                raise error
+            if command == 'get':
+                result = to_list(hash_map.get_many(payload))
+            elif command == 'contains':
+                result = [hash_map.contains_key(key) for key in payload]
+            elif command == 'items':
+                result = list(hash_map.items())
+            elif command == 'clear':
+                result = hash_map.clear()
+            elif command == 'stats':
+                result = hash_map.get_stats()
+            else:
+                raise ValueError(f"Unknown request {command!r}")
+        except Exception as exception:
+            connection.send(('error', exception))
+        else:
+            connection.send(('ok', result))
+        error = None
+
+
+class ShardedHashMap:
+    def __init__(self, shards: int = 4, capacity: int = 11, function=hash_function_1, batch_size: int = 1024,
+                 seed: int = None, **options) -> None:
+        """
+        Initialize new HashMap whose keys are split between shards worker processes
+
+        Every shard is a hash_map_sc.HashMap of the given initial capacity and hash function, which must be a
+        registered name or a module level function so that it can be sent to the workers. options are passed on to
+        every shard's HashMap as well.
+        A key's shard is picked from its hash, mixed so that it does not follow the shards' own bucket choice.
+        put() and remove() are buffered and sent to a shard batch_size at a time, or before the next request that
+        reads from that shard, so a get() always sees the caller's earlier puts.
+        seed seeds the hash function for the partitioning and the shards, a random one is drawn by default.
+        Call close() (or use the map in a with statement) to stop the workers.
+        """
+        if shards < 1 or batch_size < 1:
+            raise ValueError("shards and batch_size must be at least 1")
+
+        self._hash_function = seeded_hash_function(get_hash_function(function), random_seed() if seed is None
+                                                   else seed)
+        self._batch_size = batch_size
+        self._pending = [[] for _ in range(shards)]     # buffered (operation, key, value) per shard
+
+        self._connections = []
+        self._processes = []
+        for _ in range(shards):
+            connection, worker_connection = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=_serve, args=(worker_connection, capacity, function, seed,
+                                                                   options), daemon=True)
+            process.start()
+            worker_connection.close()
+            self._connections.append(connection)
+            self._processes.append(process)
+
+    def __enter__(self) -> "ShardedHashMap":
+        """
+        Use the map in a with statement, which closes it at the end
+        """
+        return self
+
+    def __exit__(self, *exception) -> None:
+        """
+        Stops the workers when leaving the with statement
+        """
+        self.close()
+
+    def _shard(self, key: str) -> int:
+        """
+        Returns the index of the shard that holds key
+        """
+        return mix64(self._hash_function(key)) % len(self._connections)
+
+    def _shards_of(self, keys: list) -> list:
+        """
+        Returns the index of the shard of every key in keys, hashing and mixing them as a batch
+        """
+        mixed = mix64_many(hash_many(keys, self._hash_function))
+        if isinstance(mixed, list):
+            return [hash % len(self._connections) for hash in mixed]
+        return (mixed % len(self._connections)).tolist()
+
+    def _send(self, shard: int, command: str, payload=None) -> None:
+        """
+        Sends the shard's buffered operations, then the request
+        """
+        self._flush(shard)
+        self._connections[shard].send((command, payload))
+
+    def _receive(self, shards) -> list:
+        """
+        Waits for the answer to the oldest request of every shard in shards and returns the answers in that order.
+        All of them are read before the first exception a request ended in is raised, so that no answer is left in
+        a pipe to be taken for the answer to a later request.
+        """
+        replies = [self._connections[shard].recv() for shard in shards]
+        for status, result in replies:
+            if status == 'error':
+                raise result
+        return [result for _, result in replies]
+
+    def _broadcast(self, command: str) -> list:
+        """
+        Sends a request to every shard, then collects the answers, so the shards work on it at the same time
+        """
+        for shard in range(len(self._connections)):
+            self._send(shard, command)
+        return self._receive(range(len(self._connections)))
+
+    def _buffer(self, shard: int, operation: tuple) -> None:
+        """
+        Queues a put or remove for the shard, sending the queue once it reaches batch_size
+        """
+        self._pending[shard].append(operation)
+        if len(self._pending[shard]) >= self._batch_size:
+            self._flush(shard)
+
+    def _flush(self, shard: int) -> None:
+        """
+        Sends the shard's buffered operations, without waiting for them to be applied
+        """
+        if self._pending[shard]:
+            self._connections[shard].send(('apply', self._pending[shard]))
+            self._pending[shard] = []
+
+    def flush(self) -> None:
+        """
+        Sends the buffered puts and removes of every shard
+        """
+        for shard in range(len(self._connections)):
+            self._flush(shard)
+
+    def close(self) -> None:
+        """
+        Sends the buffered operations, stops the worker processes and waits for them to exit
+        """
+        for shard in range(len(self._connections)):
+            self._send(shard, 'stop')
+            self._connections[shard].close()
+        for process in self._processes:
+            process.join()
+
+        self._connections = []
+        self._processes = []
+
+    # ------------------------------------------------------------------ #
+
+    def put(self, key: str, value: object) -> None:
+        """
+        Puts the key value pair in the hash map. If the key already exists, the value is updated.
+        """
+        self._buffer(self._shard(key), (PUT, key, value))
+
+    def put_many(self, pairs) -> None:
+        """
+        Puts every (key, value) pair of an iterable or DynamicArray in the hash map
+        """
+        pairs = to_list(pairs)
+        shards = self._shards_of([key for key, _ in pairs])
+        for (key, value), shard in zip(pairs, shards):
+            self._buffer(shard, (PUT, key, value))
+
+    def get(self, key: str) -> object:
+        """
+        Returns the value associated with the specified key. If the key is not in the hash, returns None
+        """
+        shard = self._shard(key)
+        self._send(shard, 'get', [key])
+        return self._receive([shard])[0][0]
+
+    def get_many(self, keys) -> DynamicArray:
+        """
+        Returns a dynamic array with the value of each key of an iterable or DynamicArray, None for missing keys.
+        Every shard gets a single request for all of its keys.
+        """
+        return DynamicArray(self._scatter('get', to_list(keys)))
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Returns True if the specified key is in the hash map. Returns False otherwise
+        """
+        shard = self._shard(key)
+        self._send(shard, 'contains', [key])
+        return self._receive([shard])[0][0]
+
+    def _scatter(self, command: str, keys: list) -> list:
+        """
+        Sends every shard one request with its share of keys, then puts the answers back in the order of keys
+        """
+        shards = self._shards_of(keys)
+        batches = [[] for _ in self._connections]
+        for key, shard in zip(keys, shards):
+            batches[shard].append(key)
+
+        asked = [shard for shard, batch in enumerate(batches) if batch]
+        for shard in asked:
+            self._send(shard, command, batches[shard])
+        answers = [None] * len(batches)
+        for shard, answer in zip(asked, self._receive(asked)):
+            answers[shard] = iter(answer)
+
+        return [next(answers[shard]) for shard in shards]
+
+    def remove(self, key: str) -> None:
+        """
+        Removes the specified key from the hash map
+        """
+        self._buffer(self._shard(key), (REMOVE, key, None))
+
+    def remove_many(self, keys) -> None:
+        """
+        Removes every key of an iterable or DynamicArray from the hash map
+        """
+        keys = to_list(keys)
+        for key, shard in zip(keys, self._shards_of(keys)):
+            self._buffer(shard, (REMOVE, key, None))
+
+    def clear(self) -> None:
+        """
+        Clears the contents of every shard. Does not change their capacities
+        """
+        self._broadcast('clear')
+
+    def get_size(self) -> int:
+        """
+        Return size of map
+        """
+        return sum(stats['size'] for stats in self._broadcast('stats'))
+
+    def get_capacity(self) -> int:
+        """
+        Return the total capacity of the shards
+        """
+        return sum(stats['capacity'] for stats in self._broadcast('stats'))
+
+    def table_load(self) -> float:
+        """
+        Returns the load factor over all shards
+        """
+        shard_stats = self._broadcast('stats')
+        return sum(stats['size'] for stats in shard_stats) / sum(stats['capacity'] for stats in shard_stats)
+
+    def empty_buckets(self) -> int:
+        """
+        Returns the number of empty buckets over all shards
+        """
+        return sum(stats['empty_buckets'] for stats in self._broadcast('stats'))
+
+    def get_stats(self) -> dict:
+        """
+        Returns a snapshot of the map's statistics: the totals over the shards, and every shard's own
+        hash_map_sc.HashMap.get_stats() in shard_stats
+        """
+        shard_stats = self._broadcast('stats')
+        return {
+            'shards': len(shard_stats),
+            'size': sum(stats['size'] for stats in shard_stats),
+            'capacity': sum(stats['capacity'] for stats in shard_stats),
+            'shard_sizes': [stats['size'] for stats in shard_stats],
+            'reseeds': sum(stats['reseeds'] for stats in shard_stats),
+            'shard_stats': shard_stats,
+        }
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """
+        Returns a dynamic array containing all key/value pairs stored in the hash map, shard by shard
+        """
+        result_array = DynamicArray()
+        for items in self._broadcast('items'):
+            for pair in items:
+                result_array.append(pair)
+
+        return result_array
+
+    def items(self):
+        """
+        Returns a generator over the (key, value) pairs of the hash map. Each shard's pairs are fetched in one
+        request when the generator reaches that shard.
+        """
+        for shard in range(len(self._connections)):
+            self._send(shard, 'items')
+            yield from self._receive([shard])[0]
+
+    def keys(self):
+        """
+        Returns a generator over the keys of the hash map, see items()
+        """
+        return (key for key, _ in self.items())
+
+    def values(self):
+        """
+        Returns a generator over the values of the hash map, see items()
+        """
+        return (value for _, value in self.items())
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    print("\nSharded - put, get, remove")
+    print("--------------------------")
+    with ShardedHashMap(4, 53, hash_function_1) as m:
+        for i in range(150):
+            m.put('str' + str(i), i * 100)
+        for i in range(0, 150, 2):
+            m.remove('str' + str(i))
+        print(m.get_size(), m.get_stats()['shard_sizes'], m.get('str1'), m.get('str2'), m.contains_key('str3'))
+
+    print("\nSharded - get_many")
+    print("------------------")
+    with ShardedHashMap(3, function=hash_function_2) as m:
+        m.put_many((str(i), i * 24) for i in range(10))
+        print(m.get_many(['3', '7', 'missing', '0']))
@@ -0,0 +1,294 @@
+# Course: CS261 - Data Structures
+# Assignment: 6
+# Description: Read-only open addressing hash table in a multiprocessing.shared_memory block. One writer builds it
+#              from a batch of pairs, and any number of processes attach to the block by name and look keys up in
+#              place, without copying or rebuilding the table.
+#              The table is laid out by hash_map_oa.HashMap, so it uses the same prime capacities and quadratic
+#              probing. Each bucket becomes a fixed-width (hash, offset) slot, and the keys and values live in an
+#              arena after the slots.
+
+import pickle
+import struct
+from array import array
+from multiprocessing import resource_tracker, shared_memory
+
+from a6_include import (HASH_FUNCTIONS, DynamicArray, get_hash_function, hash_function_1, hash_function_2,
+                        seeded_hash_function)
+from hash_map_oa import HashMap
+
+# magic, capacity, size, arena size, name of the hash function in HASH_FUNCTIONS, seed
+HEADER = struct.Struct('<8sQQQ32s16s')
+MAGIC = b'A6SHMOA1'
+
+# Every slot is two unsigned 64 bit integers: the masked full hash, and the offset of the record in the arena plus
+# one, 0 marking an empty slot
+SLOT_WORDS = 2
+
+# Arena record header: key length and value length in bytes, followed by the UTF-8 key and the pickled value
+RECORD = struct.Struct('<II')
+
+# Hashes are stored as unsigned 64 bit integers
+HASH_MASK = (1 << 64) - 1
+
+
+class SharedHashMap:
+    def __init__(self, name: str) -> None:
+        """
+        Attach to the shared table called name, as built by SharedHashMap.create() in this or another process.
+        The hash function and seed are read from the table, so lookups hash keys the way the writer did.
+        """
+        try:
+            self._memory = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            # Before Python 3.13 attaching registers the block with the resource tracker, which would then unlink
+            # it when this process exits, while it still belongs to the writer
+            self._memory = shared_memory.SharedMemory(name=name)
+            resource_tracker.unregister(self._memory._name, 'shared_memory')
+        self._owner = False
+        self._attach()
+
+    @classmethod
+    def create(cls, pairs, function=hash_function_1, seed: int = None, name: str = None) -> "SharedHashMap":
+        """
+        Builds a shared table holding every (key, value) pair of an iterable or DynamicArray, later pairs winning
+        for repeated keys, and returns it attached. Keys must be strings and values picklable.
+        function must be a hash function registered in a6_include.HASH_FUNCTIONS (or its name) whose result does
+        not depend on the process, which rules out 'builtin'. seed seeds the seeded ones, a random one is drawn by
+        default. name names the shared memory block, a unique one is picked by default.
+        The table cannot be changed afterwards. The creating process owns the block and must unlink() it once no
+        process needs it any more.
+        """
+        function = get_hash_function(function)
+        function_name = next((name for name, registered in HASH_FUNCTIONS.items() if registered is function), None)
+        if function_name is None or function_name == 'builtin':
+            raise ValueError("function must be one of HASH_FUNCTIONS other than 'builtin'")
+        if seed is not None and not 0 <= seed < 1 << 128:
+            raise ValueError("seed must be a non-negative 128 bit integer")
+
+        # Let the OA map pick the capacity and the bucket of every key
+        table = HashMap(11, function, seed=seed)
+        table.put_many(pairs)
+        capacity = table.get_capacity()
+
+        slots = array('Q', bytes(8 * SLOT_WORDS * capacity))
+        arena = bytearray()
+        for i in range(capacity):
+            entry = table._buckets[i]
+            if entry is None or entry.is_tombstone is True:
+                continue
+
+            key = entry.key.encode('utf-8', 'surrogatepass')
+            value = pickle.dumps(entry.value, pickle.HIGHEST_PROTOCOL)
+            slots[SLOT_WORDS * i] = entry.hash & HASH_MASK
+            slots[SLOT_WORDS * i + 1] = len(arena) + 1
+            arena += RECORD.pack(len(key), len(value)) + key + value
+
+        slots_end = HEADER.size + slots.itemsize * len(slots)
+        memory = shared_memory.SharedMemory(name=name, create=True, size=max(slots_end + len(arena), 1))
+        HEADER.pack_into(memory.buf, 0, MAGIC, capacity, table.get_size(), len(arena), function_name.encode(),
+                         table._seed.to_bytes(16, 'little'))
+        memory.buf[HEADER.size:slots_end] = slots.tobytes()
+        memory.buf[slots_end:slots_end + len(arena)] = arena
+
+        shared = cls.__new__(cls)
+        shared._memory = memory
+        shared._owner = True
+        shared._attach()
+        return shared
+
+    def _attach(self) -> None:
+        """
+        Reads the header and sets up views of the slots and of the arena, which read the shared block in place
+        """
+        magic, self._capacity, self._size, arena_size, function_name, seed = HEADER.unpack_from(self._memory.buf)
+        if magic != MAGIC:
+            raise ValueError(f"{self._memory.name} does not hold a SharedHashMap")
+
+        self._seed = int.from_bytes(seed, 'little')
+        self._hash_function = seeded_hash_function(HASH_FUNCTIONS[function_name.rstrip(b'\0').decode()],
+                                                   self._seed)
+
+        slots_end = HEADER.size + 8 * SLOT_WORDS * self._capacity
+        self._slots = self._memory.buf[HEADER.size:slots_end].cast('Q')
+        self._arena = self._memory.buf[slots_end:slots_end + arena_size]
+
+    def __enter__(self) -> "SharedHashMap":
+        """
+        Use the map in a with statement, which closes it at the end
+        """
+        return self
+
+    def __exit__(self, *exception) -> None:
+        """
+        Detaches from the block when leaving the with statement, and unlinks it if this process created it
+        """
+        self.close()
+        if self._owner:
+            self.unlink()
+
+    @property
+    def name(self) -> str:
+        """
+        Name of the shared memory block, for other processes to attach to
+        """
+        return self._memory.name
+
+    def close(self) -> None:
+        """
+        Detaches this process from the block. The map cannot be used afterwards.
+        """
+        self._slots.release()
+        self._arena.release()
+        self._memory.close()
+
+    def unlink(self) -> None:
+        """
+        Frees the block once every process has closed it. Only the process that created the table may do this.
+        """
+        if not self._owner:
+            raise ValueError("only the process that created the table can unlink it")
+
+        # A reader forked from this process shares its resource tracker, so attaching took the block off this
+        # process's list as well. Putting it back keeps unlink(), which takes it off again, from failing.
+        resource_tracker.register(self._memory._name, 'shared_memory')
+        self._memory.unlink()
+
+    def get_size(self) -> int:
+        """
+        Return size of map
+        """
+        return self._size
+
+    def get_capacity(self) -> int:
+        """
+        Return capacity of map
+        """
+        return self._capacity
+
+    def table_load(self) -> float:
+        """
+        Returns the current hash table load factor
+        """
+        return self._size / self._capacity
+
+    def empty_buckets(self) -> int:
+        """
+        Returns the number of empty buckets in the hash table
+        """
+        return self._capacity - self._size
+
+    # ------------------------------------------------------------------ #
+
+    def _record(self, offset: int) -> tuple:
+        """
+        Returns (key, value) views of the arena record at offset, without copying
+        """
+        key_length, value_length = RECORD.unpack_from(self._arena, offset)
+        start = offset + RECORD.size
+        return self._arena[start:start + key_length], self._arena[start + key_length:start + key_length + value_length]
+
+    def _find_record(self, key: str) -> int:
+        """
+        Returns the arena offset of the record of the specified key, or -1 if it does not exist. The stored hashes
+        are compared first, and the key bytes are compared in the arena itself.
+        """
+        hash = self._hash_function(key)
+        stored_hash = hash & HASH_MASK
+        key_bytes = key.encode('utf-8', 'surrogatepass')
+
+        slots, capacity = self._slots, self._capacity
+        hash_value = hash % capacity
+        initial_hash = hash_value
+        j = 1
+
+        # Keep looking until an empty slot is found, the same quadratic probing as hash_map_oa.HashMap. The walk gives
+        # up after capacity steps, see hash_map_oa.HashMap._find_slot().
+        while j <= capacity and slots[SLOT_WORDS * hash_value + 1] != 0:
+            if slots[SLOT_WORDS * hash_value] == stored_hash:
+                offset = slots[SLOT_WORDS * hash_value + 1] - 1
+                stored_key, _ = self._record(offset)
+                if stored_key == key_bytes:
+                    return offset
+
+            # Move to the next hash value
+            hash_value = (initial_hash + (j * j)) % capacity
+            j += 1
+
+        return -1
+
+    def get(self, key: str) -> object:
+        """
+        Returns the value associated with the specified key. If the key is not in the hash, returns None. The value
+        is unpickled straight from the shared block.
+        """
+        offset = self._find_record(key)
+        if offset < 0:
+            return None
+        return pickle.loads(self._record(offset)[1])
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Returns True if the specified key is in the hash map. Returns False otherwise
+        """
+        return self._find_record(key) >= 0
+
+    def _pair(self, offset: int) -> tuple:
+        """
+        Returns the key and the value of the arena record at offset, copied out of the shared block
+        """
+        key, value = self._record(offset)
+        return str(key, 'utf-8', 'surrogatepass'), pickle.loads(value)
+
+    def items(self):
+        """
+        Returns a generator over the (key, value) pairs of the hash map, in slot order
+        """
+        for i in range(self._capacity):
+            if self._slots[SLOT_WORDS * i + 1] != 0:
+                yield self._pair(self._slots[SLOT_WORDS * i + 1] - 1)
+
+    def keys(self):
+        """
+        Returns a generator over the keys of the hash map, see items()
+        """
+        return (key for key, _ in self.items())
+
+    def values(self):
+        """
+        Returns a generator over the values of the hash map, see items()
+        """
+        return (value for _, value in self.items())
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """
+        Returns a dynamic array containing all key/value pairs stored in the hash map
+        """
+        return DynamicArray(list(self.items()))
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+    import multiprocessing
+
+    def reader(name, keys, queue):
+        with SharedHashMap(name) as shared:
+            queue.put([shared.get(key) for key in keys])
+
+    print("\nShared - create, get")
+    print("--------------------")
+    with SharedHashMap.create((('str' + str(i), i * 100) for i in range(150)), hash_function_1) as m:
+        print(m.get_size(), m.get_capacity(), m.empty_buckets(), m.get('str1'), m.get('str200'), m.contains_key('str3'))
+
+        print("\nShared - get from another process")
+        print("---------------------------------")
+        results = multiprocessing.Queue()
+        process = multiprocessing.Process(target=reader, args=(m.name, ['str5', 'str149', 'missing'], results))
+        process.start()
+        print(results.get())
+        process.join()
+
+    print("\nShared - get_keys_and_values")
+    print("----------------------------")
+    with SharedHashMap.create([(str(i), str(i * 24)) for i in range(5)], hash_function_2) as m:
+        print(m.get_keys_and_values())
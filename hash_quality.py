@@ -0,0 +1,112 @@
+# Course: CS261 - Data Structures
+# Assignment: 6
+# Description: Collision-quality report for the hash functions of a6_include.HASH_FUNCTIONS. Loads a corpus of keys
+#              into both HashMaps and reports how evenly each hash function spreads it: chain lengths for separate
+#              chaining and probe lengths for open addressing.
+#              Run `python hash_quality.py` for a report over a corpus of similar "user:<id>" keys.
+
+import hash_map_oa
+import hash_map_sc
+from a6_include import HASH_FUNCTIONS, get_hash_function
+
+
+def _probe_length(capacity: int, index: int, hash: int) -> int:
+    """
+    Returns the number of buckets the quadratic probe sequence of hash visits to reach the bucket at index
+    """
+    hash_value = hash % capacity
+    initial_hash = hash_value
+    j = 1
+    while hash_value != index:
+        hash_value = (initial_hash + (j * j)) % capacity
+        j += 1
+    return j
+
+
+def collision_report(keys, function) -> dict:
+    """
+    Loads keys into a chaining and an open addressing HashMap (default prime capacities, grown by put()) and
+    returns how the hash function, or the name of one in HASH_FUNCTIONS, spread them:
+    distinct_hashes counts the different full hashes, longest_chain and chain_lengths (chain length -> buckets)
+    describe the chaining map, and max_probe, mean_probe and probe_lengths (probe length -> keys) describe the
+    number of buckets a lookup of each key visits in the open addressing map.
+    """
+    function = get_hash_function(function)
+    keys = list(keys)
+
+    chaining = hash_map_sc.HashMap(11, function)
+    addressing = hash_map_oa.HashMap(11, function)
+    for key in keys:
+        chaining.put(key, None)
+        addressing.put(key, None)
+
+    stats = chaining.get_stats()
+    probe_lengths = {}
+    for index in range(addressing.get_capacity()):
+        entry = addressing._buckets[index]
+        if entry is not None and entry.is_tombstone is False:
+            length = _probe_length(addressing.get_capacity(), index, entry.hash)
+            probe_lengths[length] = probe_lengths.get(length, 0) + 1
+
+    return {
+        'keys': len(keys),
+        'distinct_hashes': len(set(map(function, keys))),
+        'longest_chain': stats['longest_chain'],
+        'chain_lengths': stats['chain_lengths'],
+        'max_probe': max(probe_lengths, default=0),
+        'mean_probe': sum(length * count for length, count in probe_lengths.items()) / max(len(keys), 1),
+        'probe_lengths': probe_lengths,
+    }
+
+
+def _histogram_row(histogram: dict, limits: tuple) -> list:
+    """
+    Returns the counts of a length -> count histogram grouped into the ranges ending at each of limits, plus the rest
+    """
+    row = [0] * (len(limits) + 1)
+    for length, count in histogram.items():
+        group = 0
+        while group < len(limits) and length > limits[group]:
+            group += 1
+        row[group] += count
+    return row
+
+
+def print_report(keys, functions=None) -> None:
+    """
+    Prints collision_report() for every hash function in functions (names or functions), all of HASH_FUNCTIONS by
+    default
+    """
+    keys = list(keys)
+    limits = (1, 2, 4, 8, 16, 64)
+    labels = ['1', '2', '3-4', '5-8', '9-16', '17-64', '>64']
+
+    reports = []
+    for function in functions or HASH_FUNCTIONS:
+        name = function if isinstance(function, str) else function.__name__
+        reports.append((name, collision_report(keys, function)))
+
+    title = f"collision quality, {len(keys)} keys"
+    print("\n" + title)
+    print("-" * len(title))
+    print(f"{'function':>16} {'distinct':>9} {'longest chain':>14} {'max probe':>10} {'mean probe':>11}")
+    for name, report in reports:
+        print(f"{name:>16} {report['distinct_hashes']:>9} {report['longest_chain']:>14} {report['max_probe']:>10} "
+              f"{report['mean_probe']:>11.2f}")
+
+    print("\nopen addressing probe lengths, keys per range")
+    print(f"{'function':>16} " + ' '.join(f"{label:>6}" for label in labels))
+    for name, report in reports:
+        print(f"{name:>16} " + ' '.join(f"{count:>6}" for count in _histogram_row(report['probe_lengths'], limits)))
+
+    print("\nseparate chaining chain lengths, buckets per range")
+    print(f"{'function':>16} " + ' '.join(f"{label:>6}" for label in labels))
+    for name, report in reports:
+        print(f"{name:>16} " + ' '.join(f"{count:>6}" for count in _histogram_row(report['chain_lengths'], limits)))
+
+
+# ------------------- REPORT ----------------------------------------------- #
+
+if __name__ == "__main__":
+    # Short keys sharing a prefix, with many anagrams ("user:123" and "user:321")
+    print_report('user:' + str(i) for i in range(3000))
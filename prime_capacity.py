@@ -0,0 +1,133 @@
+# Course: CS261 - Data Structures
+# Assignment: 6
+# Description: Capacity planning for the hash maps. Picks prime capacities without trial division in a Python
+#              loop: a sieve answers small requests by table lookup, and a deterministic Miller-Rabin test handles
+#              anything larger.
+
+from bisect import bisect_left
+from math import gcd, prod
+
+# Requests below this are answered straight from the sieve
+SIEVE_LIMIT = 1 << 16
+
+
+def _sieve(limit: int) -> bytearray:
+    """Return a bytearray where index i is 1 if i is prime, for 0 <= i < limit."""
+    sieve = bytearray([1]) * limit
+    sieve[0] = sieve[1] = 0
+    for factor in range(2, int(limit ** 0.5) + 1):
+        if sieve[factor]:
+            sieve[factor * factor::factor] = bytes(len(range(factor * factor, limit, factor)))
+    return sieve
+
+
+_SIEVE = _sieve(SIEVE_LIMIT)
+
+# Odd primes below SIEVE_LIMIT, in increasing order
+SMALL_PRIMES = tuple(n for n in range(3, SIEVE_LIMIT) if _SIEVE[n])
+
+# Product of the primes below 1000, one gcd() with it stands in for trial division by all of them
+_SMALL_PRODUCT = prod([2] + [p for p in SMALL_PRIMES if p < 1000])
+
+# Miller-Rabin is deterministic for every n below bound when the first count primes are used as witnesses
+_WITNESSES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41)
+_WITNESS_BOUNDS = (
+    (3215031751, 4),
+    (3474749660383, 6),
+    (341550071728321, 7),
+    (3825123056546413051, 9),
+    (318665857834031151167461, 12),
+    (3317044064679887385961981, 13),
+)
+
+
+def is_prime(n: int) -> bool:
+    """
+    Determine if n is a prime number. O(1) below SIEVE_LIMIT, otherwise a gcd() with the small primes followed by a
+    Miller-Rabin test with as many fixed witnesses as the size of n calls for (deterministic below 3.3 * 10**24).
+    """
+    if n < SIEVE_LIMIT:
+        return n >= 0 and _SIEVE[n] == 1
+
+    if gcd(n, _SMALL_PRODUCT) != 1:
+        return False
+
+    # Write n - 1 as d * 2**s with d odd
+    d, s = n - 1, 0
+    while d % 2 == 0:
+        d //= 2
+        s += 1
+
+    # Past the last bound the full witness set makes the test probabilistic, but no counterexample is known
+    count = len(_WITNESSES)
+    for bound, witnesses in _WITNESS_BOUNDS:
+        if n < bound:
+            count = witnesses
+            break
+
+    for witness in _WITNESSES[:count]:
+        x = pow(witness, d, n)
+        if x == 1 or x == n - 1:
+            continue
+        for _ in range(s - 1):
+            x = x * x % n
+            if x == n - 1:
+                break
+        else:
+            return False
+
+    return True
+
+
+def next_prime(n: int) -> int:
+    """
+    Return the smallest odd prime equal to or larger than n, the capacity rule both HashMaps use.
+    Small requests are a binary search over SMALL_PRIMES, larger ones test odd candidates with is_prime().
+    """
+    if n <= SMALL_PRIMES[-1]:
+        return SMALL_PRIMES[bisect_left(SMALL_PRIMES, n)]
+
+    candidate = n | 1
+    while not is_prime(candidate):
+        candidate += 2
+    return candidate
+
+
+# ------------------- MICRO-BENCHMARK -------------------------------------- #
+
+if __name__ == "__main__":
+    import time
+
+    def trial_division_next_prime(capacity: int) -> int:
+        """The original HashMap._next_prime() / _is_prime() pair, for comparison"""
+        def is_prime_trial(number: int) -> bool:
+            if number == 2 or number == 3:
+                return True
+            if number == 1 or number % 2 == 0:
+                return False
+            factor = 3
+            while factor ** 2 <= number:
+                if number % factor == 0:
+                    return False
+                factor += 2
+            return True
+
+        if capacity % 2 == 0:
+            capacity += 1
+        while not is_prime_trial(capacity):
+            capacity += 2
+        return capacity
+
+    print("\nnext_prime() per call, microseconds")
+    print("-----------------------------------")
+    print(f"{'capacity':>14} {'trial division':>15} {'next_prime':>11}")
+    for capacity in (100, 10 ** 4, 10 ** 6, 10 ** 8, 10 ** 10, 10 ** 12):
+        assert trial_division_next_prime(capacity) == next_prime(capacity)
+        row = []
+        for function in (trial_division_next_prime, next_prime):
+            calls = 10 if function is trial_division_next_prime and capacity >= 10 ** 10 else 1000
+            start = time.perf_counter()
+            for _ in range(calls):
+                function(capacity)
+            row.append((time.perf_counter() - start) / calls * 10 ** 6)
+        print(f"{capacity:>14} {row[0]:>15.2f} {row[1]:>11.2f}")